@@ -1,11 +1,16 @@
 import os
-from flask import Blueprint, render_template, request, redirect, session
-from crypto_data import load_holdings, save_holdings, load_suggestions, update_suggestion_status, delete_suggestion, get_cache_snapshot
+from flask import Blueprint, Response, render_template, request, redirect, session
+from crypto_data import load_holdings, save_holdings, get_cache_snapshot
+from suggestion_store import STATUSES, load_suggestions, count_suggestions, update_suggestion_status, delete_suggestion
 from site_meta import SITE_CREATED, site_last_updated
+from metrics import gauge_lines, render
 
 admin_bp = Blueprint("admin", __name__)
 
 ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "")
+# Prometheus cannot log in, so scrapers authenticate with "Authorization: Bearer <METRICS_TOKEN>".
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+SUGGESTIONS_PAGE_SIZE = 50
 
 
 @admin_bp.route("/admin", methods=["GET", "POST"])
@@ -20,7 +25,6 @@ def admin():
         return render_template("admin.html", active="admin")
 
     holdings = load_holdings()
-    suggestions = load_suggestions()
     if request.method == "POST":
         action = request.form.get("action")
         if action == "add":
@@ -38,34 +42,39 @@ def admin():
                 save_holdings(holdings)
             return redirect("/admin")
         if action == "suggestion_status":
-            idx = int(request.form.get("s_index", "-1"))
+            suggestion_id = int(request.form.get("s_id", "-1"))
             status = request.form.get("status", "new")
-            update_suggestion_status(idx, status)
+            update_suggestion_status(suggestion_id, status)
             return redirect("/admin")
         if action == "suggestion_delete":
-            idx = int(request.form.get("s_index", "-1"))
-            delete_suggestion(idx)
+            suggestion_id = int(request.form.get("s_id", "-1"))
+            delete_suggestion(suggestion_id)
             return redirect("/admin")
 
-    indexed = list(enumerate(suggestions))
-    indexed.reverse()
+    page = max(0, request.args.get("page", 0, type=int))
+    offset = page * SUGGESTIONS_PAGE_SIZE
     groups = {
-        "new": [(i, s) for i, s in indexed if s.get("status") == "new"],
-        "in_progress": [(i, s) for i, s in indexed if s.get("status") == "in_progress"],
-        "done": [(i, s) for i, s in indexed if s.get("status") == "done"],
+        status: [(s["id"], s) for s in load_suggestions(status=status, limit=SUGGESTIONS_PAGE_SIZE, offset=offset)]
+        for status in STATUSES
     }
+    counts = count_suggestions()
     stats = {
         "holdings": len(holdings),
-        "suggestions": len(suggestions),
-        "new_suggestions": len([s for s in suggestions if s.get("status") == "new"]),
+        "suggestions": counts["total"],
+        "new_suggestions": counts["new"],
+    }
+    pages = {
+        "page": page,
+        "prev": page - 1 if page > 0 else None,
+        "next": page + 1 if any(counts[status] > offset + SUGGESTIONS_PAGE_SIZE for status in STATUSES) else None,
     }
     cache_snapshot = get_cache_snapshot()
 
     return render_template(
         "admin.html",
         holdings=holdings,
-        suggestions=suggestions,
         suggestion_groups=groups,
+        suggestion_pages=pages,
         stats=stats,
         cache_snapshot=cache_snapshot,
         site_created=SITE_CREATED,
@@ -79,3 +88,43 @@ def admin():
 def logout():
     session.pop("admin", None)
     return redirect("/")
+
+
+def _snapshot_metrics(snapshot):
+    stats = snapshot["stats"]
+    # Keys can carry user input (search text), so entries are only exported per namespace.
+    namespaces = {}
+    for key, entry in snapshot["entries"].items():
+        ns = namespaces.setdefault(key.split(":", 1)[0], {"entries": 0, "bytes": 0, "age": 0, "errors": 0})
+        ns["entries"] += 1
+        ns["bytes"] += entry["bytes"]
+        ns["age"] = max(ns["age"], entry["age_seconds"])
+        ns["errors"] += int(entry["status"] == "error")
+    namespaces = sorted(namespaces.items())
+    upstreams = sorted(snapshot["upstreams"].items())
+    feeds = sorted(snapshot["feeds"].items())
+    return [
+        gauge_lines("cache_entries", "Entries in the in-process cache.", [((), stats["entries"])]),
+        gauge_lines("cache_bytes", "Approximate size of all cached values.", [((), stats["bytes"])]),
+        gauge_lines("cache_hits_total", "Cache reads that found an entry.", [((), stats["hits"])], metric_type="counter"),
+        gauge_lines("cache_misses_total", "Cache reads that found nothing.", [((), stats["misses"])], metric_type="counter"),
+        gauge_lines("cache_evictions_total", "Entries evicted by the size limits.", [((), stats["evictions"])], metric_type="counter"),
+        gauge_lines("cache_expirations_total", "Entries dropped after expiring.", [((), stats["expirations"])], metric_type="counter"),
+        gauge_lines("cache_namespace_entries", "Cached entries per key namespace.", [((name,), ns["entries"]) for name, ns in namespaces], ("namespace",)),
+        gauge_lines("cache_namespace_bytes", "Size of the cached values per key namespace.", [((name,), ns["bytes"]) for name, ns in namespaces], ("namespace",)),
+        gauge_lines("cache_namespace_max_age_seconds", "Age of the oldest cached value per key namespace.", [((name,), ns["age"]) for name, ns in namespaces], ("namespace",)),
+        gauge_lines("cache_namespace_errors", "Entries whose last refresh failed, per key namespace.", [((name,), ns["errors"]) for name, ns in namespaces], ("namespace",)),
+        gauge_lines("upstream_circuit_open", "1 while the host's circuit breaker is open or half open.", [((host,), int(b["state"] != "closed")) for host, b in upstreams], ("host",)),
+        gauge_lines("upstream_consecutive_failures", "Failures since the host's last success.", [((host,), b["failures"]) for host, b in upstreams], ("host",)),
+        gauge_lines("news_feed_poll_interval_seconds", "Current polling interval per news feed.", [((source,), f["interval"]) for source, f in feeds], ("source",)),
+        gauge_lines("news_feed_failures", "Consecutive failures per news feed.", [((source,), f["failures"]) for source, f in feeds], ("source",)),
+    ]
+
+
+@admin_bp.route("/metrics")
+def metrics_page():
+    authorized = "admin" in session or (METRICS_TOKEN and request.headers.get("Authorization") == f"Bearer {METRICS_TOKEN}")
+    if not authorized:
+        return Response("Forbidden\n", status=403, mimetype="text/plain")
+    body = render(_snapshot_metrics(get_cache_snapshot()))
+    return Response(body, mimetype="text/plain; version=0.0.4")
@@ -1,26 +1,73 @@
-from flask import Blueprint, request
-from crypto_data import get_btc_data, get_fear_greed, get_top_coins, get_my_coins, market_mood, search_coins, get_crypto_news, load_holdings
+import hashlib
+import time
+
+from flask import Blueprint, Response, request, stream_with_context
+from crypto_data import get_top_coins, get_my_coins, search_coins, get_crypto_news, load_holdings, get_cache_version, get_holdings_version, get_summary_snapshot, cache_change_seq, wait_for_cache_change, get_markets_page, get_markets_version, MARKET_SORTS, MARKET_FILTERS, MARKETS_PAGE_SIZE, MARKETS_TOP_SIZE, MY_COINS_ORDER
+from http_cache import conditional_response, json_response
+from markets import with_websites
+from price_history import RANGES, get_history
+from site_search import find
 
 api_bp = Blueprint("api", __name__)
 
+STREAM_HEARTBEAT_SECONDS = 15
+# Each open stream holds a worker thread, so streams end after this long and the
+# browser reconnects (with Last-Event-ID). Run under threaded or async workers
+# (e.g. gunicorn --threads or gevent); a sync worker serves one stream at a time.
+STREAM_MAX_SECONDS = 300
+# Enough for the whole list, so the markets page can refresh every row it has loaded.
+MARKETS_MAX_LIMIT = MARKETS_TOP_SIZE + len(MY_COINS_ORDER)
+FIND_LIMIT = 10
+_STREAM_EVENT = {"version": None, "data": None}
+
 
 @api_bp.route("/api/summary")
 def api_summary():
-    btc = get_btc_data()
-    top_coins = get_top_coins()
-    my_coins = get_my_coins()
-    if my_coins:
-        order = ["smlo", "bitcoin", "solana", "polygon-ecosystem-token", "dogecoin", "litecoin", "binancecoin", "mantle", "nano", "banano", "atto"]
-        my_map = {coin.get("id"): coin for coin in my_coins}
-        my_coins = [my_map[i] for i in order if i in my_map] + [c for c in my_coins if c.get("id") not in order]
-    fear_greed = get_fear_greed()
-    return {
-        "btc": btc,
-        "top_coins": top_coins,
-        "my_coins": my_coins,
-        "fear_greed": fear_greed,
-        "mood": market_mood(btc.get("change_24h") if btc else None),
-    }
+    snapshot = get_summary_snapshot()
+    if snapshot.etag is None:
+        return snapshot.data
+    return conditional_response(snapshot.etag, lambda: snapshot.body, gzipped=snapshot.gzipped)
+
+
+def _event_id(snapshot):
+    # Partial data (some upstream still missing) has no version; fall back to a content hash.
+    return snapshot.version or "h-" + hashlib.sha1(snapshot.body).hexdigest()[:16]
+
+
+def _summary_event(snapshot, event_id):
+    # All open streams share one encoded event per data version.
+    event = _STREAM_EVENT
+    if event["version"] != event_id:
+        data = snapshot.body.decode("utf-8")
+        event = {"version": event_id, "data": f"id: {event_id}\nevent: summary\ndata: {data}\n\n"}
+        _STREAM_EVENT.update(event)
+    return event["data"]
+
+
+@api_bp.route("/api/stream")
+def api_stream():
+    last_id = request.headers.get("Last-Event-ID")
+
+    def events():
+        nonlocal last_id
+        yield "retry: 5000\n\n"
+        deadline = time.monotonic() + STREAM_MAX_SECONDS
+        while time.monotonic() < deadline:
+            # Read the change counter first so a change during the snapshot build is not missed.
+            seq = cache_change_seq()
+            snapshot = get_summary_snapshot()
+            event_id = _event_id(snapshot)
+            if event_id != last_id:
+                last_id = event_id
+                yield _summary_event(snapshot, event_id)
+            elif not wait_for_cache_change(seq, min(STREAM_HEARTBEAT_SECONDS, max(0, deadline - time.monotonic()))):
+                yield ": ping\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @api_bp.route("/api/search")
@@ -41,13 +88,64 @@ def api_search():
 
 @api_bp.route("/api/news")
 def api_news():
+    # Version before data: a refresh in between then pairs a newer body with an
+    # older tag (one extra 200 later) rather than stale data with the new tag.
+    version = get_cache_version("news")
     items = get_crypto_news(limit=30)
-    return {"items": items}
+    return json_response(version and f"news-{version}", lambda: {"items": items})
 
 
 @api_bp.route("/api/personal")
 def api_personal():
-    return {
-        "my_coins": get_my_coins(),
-        "holdings": load_holdings(),
-    }
+    version = get_cache_version("my_coins")
+    etag = version and f"personal-{version}-{get_holdings_version()}"
+    my_coins = get_my_coins()
+    return json_response(etag, lambda: {"my_coins": my_coins, "holdings": load_holdings()})
+
+
+@api_bp.route("/api/find")
+def api_find():
+    query = request.args.get("q", "").strip()
+    return {"query": query, "results": find(query, limit=FIND_LIMIT) if query else []}
+
+
+@api_bp.route("/api/history/<coin_id>")
+def api_history(coin_id):
+    range_name = request.args.get("range", "24h")
+    if range_name not in RANGES:
+        return {"error": f"range must be one of {', '.join(RANGES)}"}, 400
+    return {"coin_id": coin_id, "range": range_name, "points": get_history(coin_id, range_name)}
+
+
+@api_bp.route("/api/markets")
+def api_markets():
+    sort = request.args.get("sort", "default")
+    order = request.args.get("order", "desc")
+    change = request.args.get("change") or None
+    if sort not in MARKET_SORTS:
+        return {"error": f"sort must be one of {', '.join(MARKET_SORTS)}"}, 400
+    if order not in ("asc", "desc"):
+        return {"error": "order must be asc or desc"}, 400
+    if change is not None and change not in MARKET_FILTERS:
+        return {"error": f"change must be one of {', '.join(MARKET_FILTERS)}"}, 400
+    try:
+        min_market_cap = float(request.args["min_market_cap"]) if request.args.get("min_market_cap") else None
+        limit = max(1, min(int(request.args.get("limit", MARKETS_PAGE_SIZE)), MARKETS_MAX_LIMIT))
+    except ValueError:
+        return {"error": "min_market_cap and limit must be numbers"}, 400
+
+    def payload():
+        page = get_markets_page(
+            sort=sort,
+            descending=order == "desc",
+            min_market_cap=min_market_cap,
+            change=change,
+            watchlist=request.args.get("watchlist") in ("1", "true"),
+            cursor=request.args.get("cursor"),
+            limit=limit,
+        )
+        with_websites(page["items"])
+        return page
+
+    version = get_markets_version()
+    return json_response(version and f"markets-{version}", payload)
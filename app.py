@@ -1,8 +1,10 @@
 import os
 import sys
-from flask import Flask
+import time
+from flask import Flask, g, request
 from dotenv import load_dotenv
 from site_meta import SITE_CREATED, site_last_updated
+from metrics import ROUTE_LATENCY
 
 # Ensure local modules are importable when run via Flask CLI
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
@@ -19,6 +21,20 @@ def inject_site_meta():
         "site_updated": site_last_updated(),
     }
 
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        ROUTE_LATENCY.observe(time.perf_counter() - started, route, request.method, str(response.status_code))
+    return response
+
 from home import home_bp
 from markets import markets_bp
 from tools import tools_bp
@@ -28,6 +44,7 @@ from api import api_bp
 from news import news_bp
 from guide import guide_bp
 from suggestions import suggestions_bp
+from crypto_data import start_background_refresh
 
 app.register_blueprint(home_bp)
 app.register_blueprint(markets_bp)
@@ -39,6 +56,9 @@ app.register_blueprint(news_bp)
 app.register_blueprint(guide_bp)
 app.register_blueprint(suggestions_bp)
 
+if os.environ.get("BACKGROUND_REFRESH", "1") != "0":
+    start_background_refresh()
+
 
 if __name__ == "__main__":
     app.run(host="127.0.0.1", port=5002, debug=True)
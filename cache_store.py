@@ -0,0 +1,183 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def _entry_size(entry):
+    try:
+        return len(json.dumps(entry.get("value"), ensure_ascii=False, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+class MemoryCache:
+    # LRU + TTL store for cache entries. Entries are dicts carrying an
+    # absolute "expires" timestamp after which they are dropped on access or sweep.
+
+    def __init__(self, max_entries=512, max_bytes=8 * 1024 * 1024, sweep_interval=60):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry.get("expires", float("inf")) <= time.time():
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def peek(self, key):
+        with self._lock:
+            return self._data.get(key)
+
+    def set(self, key, entry):
+        size = _entry_size(entry)
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = entry
+            self._sizes[key] = size
+            self._bytes += size
+            while len(self._data) > 1 and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+            if time.time() - self._last_sweep >= self.sweep_interval:
+                self._sweep()
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+
+    def sweep(self):
+        with self._lock:
+            return self._sweep()
+
+    def items(self):
+        with self._lock:
+            return list(self._data.items())
+
+    def size_of(self, key):
+        return self._sizes.get(key, 0)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _drop(self, key):
+        self._data.pop(key, None)
+        self._bytes -= self._sizes.pop(key, 0)
+
+    def _sweep(self):
+        now = time.time()
+        self._last_sweep = now
+        expired = [k for k, e in self._data.items() if e.get("expires", float("inf")) <= now]
+        for key in expired:
+            self._drop(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SharedCache:
+    # Cross-process cache tier in a SQLite file (WAL). Workers read entries
+    # freely; a per-key lease makes sure only one of them refetches upstream.
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, entry TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, until REAL NOT NULL)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        # Connections must not cross a fork into worker processes.
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        try:
+            row = self._connect().execute("SELECT entry, expires FROM entries WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None or row[1] <= time.time():
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def set(self, key, entry):
+        try:
+            payload = json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str)
+            self._connect().execute(
+                "INSERT OR REPLACE INTO entries (key, entry, expires) VALUES (?, ?, ?)",
+                (key, payload, entry.get("expires", float("inf"))),
+            )
+        except (sqlite3.Error, TypeError, ValueError):
+            pass
+
+    def try_lease(self, key, owner, seconds):
+        now = time.time()
+        try:
+            cur = self._connect().execute(
+                """
+                INSERT INTO leases (key, owner, until) VALUES (?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, until = excluded.until
+                WHERE leases.until < ? OR leases.owner = excluded.owner
+                """,
+                (key, owner, now + seconds, now),
+            )
+        except sqlite3.Error:
+            # If the shared tier is unusable, behave like a single worker.
+            return True
+        return cur.rowcount == 1
+
+    def release(self, key, owner):
+        try:
+            self._connect().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+        except sqlite3.Error:
+            pass
+
+    def sweep(self):
+        try:
+            self._connect().execute("DELETE FROM entries WHERE expires <= ?", (time.time(),))
+        except sqlite3.Error:
+            pass
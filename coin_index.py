@@ -0,0 +1,94 @@
+from bisect import bisect_left
+
+# Ranking tiers, lower is better.
+EXACT_SYMBOL = 0
+EXACT_NAME = 1
+SYMBOL_PREFIX = 2
+NAME_PREFIX = 3
+NAME_SUBSTRING = 4
+
+PREFIX_SCAN_LIMIT = 2000
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class CoinIndex:
+    # In-memory lookup over the CoinGecko /coins/list payload: exact symbol and
+    # name maps, sorted arrays for prefix scans and a trigram index for substrings.
+
+    def __init__(self, coins):
+        self.ids = []
+        self.names = []
+        self.symbols = []
+        self.by_symbol = {}
+        self.by_name = {}
+        self.trigrams = {}
+        for coin in coins:
+            cid = coin.get("id")
+            if not cid:
+                continue
+            idx = len(self.ids)
+            name = (coin.get("name") or "").lower()
+            sym = (coin.get("symbol") or "").lower()
+            self.ids.append(cid)
+            self.names.append(name)
+            self.symbols.append(sym)
+            self.by_symbol.setdefault(sym, []).append(idx)
+            self.by_name.setdefault(name, []).append(idx)
+            for gram in _trigrams(name):
+                self.trigrams.setdefault(gram, []).append(idx)
+        self.sorted_names = sorted((n, i) for i, n in enumerate(self.names) if n)
+        self.sorted_symbols = sorted((s, i) for i, s in enumerate(self.symbols) if s)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _prefix(self, sorted_pairs, query):
+        start = bisect_left(sorted_pairs, (query, -1))
+        matches = []
+        for text, idx in sorted_pairs[start:start + PREFIX_SCAN_LIMIT]:
+            if not text.startswith(query):
+                break
+            matches.append(idx)
+        return matches
+
+    def _substring(self, query):
+        grams = _trigrams(query)
+        if not grams:
+            return []
+        postings = sorted((self.trigrams.get(g, []) for g in grams), key=len)
+        if not postings[0]:
+            return []
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        return [idx for idx in candidates if query in self.names[idx]]
+
+    def _tiebreak(self, idx):
+        # Canonical listings (id derived from the name) before wrapped/bridged copies.
+        name = self.names[idx]
+        canonical = self.ids[idx] == name.replace(" ", "-")
+        return (not canonical, len(name), self.ids[idx])
+
+    def search(self, query, limit=6):
+        query = (query or "").strip().lower()
+        if not query:
+            return []
+        tiers = {}
+
+        def add(indexes, tier):
+            for idx in indexes:
+                if idx not in tiers or tier < tiers[idx]:
+                    tiers[idx] = tier
+
+        add(self.by_symbol.get(query, []), EXACT_SYMBOL)
+        add(self.by_name.get(query, []), EXACT_NAME)
+        add(self._prefix(self.sorted_symbols, query), SYMBOL_PREFIX)
+        add(self._prefix(self.sorted_names, query), NAME_PREFIX)
+        add(self._substring(query), NAME_SUBSTRING)
+        ranked = sorted(tiers, key=lambda idx: (tiers[idx],) + self._tiebreak(idx))
+        return [self.ids[idx] for idx in ranked[:limit]]
@@ -4,245 +4,630 @@ import re
 import html
 from datetime import datetime, timezone
 import time
+import threading
+import gzip
+from bisect import insort
+import hashlib
+import math
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
 import requests
 import feedparser
+from cache_store import MemoryCache, SharedCache
+from coin_index import CoinIndex
+from market_table import MarketTable, market_record
+import metrics
+import upstream
+import price_history
 
 HOLDINGS_PATH = "holdings.json"
 TOP_COINS_CACHE = "top_coins_cache.json"
 NEWS_CACHE = "news_cache.json"
 MY_COINS_CACHE = "my_coins_cache.json"
 COINGECKO_LIST_CACHE = "coingecko_list_cache.json"
-SUGGESTIONS_PATH = "suggestions.json"
 
 SESSION = requests.Session()
-_CACHE = {}
+HOLDINGS_CHECK_SECONDS = 1
+_HOLDINGS = {"items": [], "stat": None, "checked": 0.0}
+_HOLDINGS_LOCK = threading.Lock()
+_CACHE = MemoryCache(max_entries=512, max_bytes=8 * 1024 * 1024)
+MARKETS = MarketTable()
+# Set SHARED_CACHE_PATH to share cached upstream data between worker processes.
+SHARED_CACHE_PATH = os.environ.get("SHARED_CACHE_PATH")
+_SHARED = SharedCache(SHARED_CACHE_PATH) if SHARED_CACHE_PATH else None
+SHARED_POLL_SECONDS = 0.2
+
+NEWS_FEED_LIMIT = 30
+NEWS_STORE_LIMIT = 500
+NEWS_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+# Rolling store: items by url (or feed id), plus (-published_ts, key) pairs kept sorted newest first.
+_NEWS_STORE = {"items": {}, "order": [], "seeded": False}
+_NEWS_STORE_LOCK = threading.Lock()
+NEWS_FETCH_BUDGET_SECONDS = 8
+NEWS_FEEDS = [
+    ("CoinDesk", "https://www.coindesk.com/arc/outboundfeeds/rss/"),
+    ("Cointelegraph", "https://cointelegraph.com/rss"),
+    ("The Block", "https://www.theblock.co/rss.xml"),
+    ("Reddit r/CryptoCurrency", "https://www.reddit.com/r/CryptoCurrency/.rss"),
+    ("Reddit r/Bitcoin", "https://www.reddit.com/r/Bitcoin/.rss"),
+]
+# Each feed is polled on its own interval, derived from how often it publishes
+# and backed off exponentially while it keeps failing.
+NEWS_POLL_MIN_SECONDS = 300
+NEWS_POLL_MAX_SECONDS = 6 * 3600
+NEWS_POLL_DEFAULT_SECONDS = 1800
+NEWS_POLL_IDLE_FACTOR = 1.5
+_FEED_STATE = {}
+COIN_LIST_RETRY_SECONDS = 600
+_COIN_INDEX = {"mtime": None, "updated": 0, "attempted": 0, "index": None}
+_COIN_INDEX_LOCK = threading.Lock()
+MY_COINS_DEADLINE_SECONDS = 12
+TOP_PAGE_SIZE = 250
+TOP_MAX_PAGES = 4
+# How many top coins the markets table lists (and keeps refreshed), up to TOP_PAGE_SIZE * TOP_MAX_PAGES.
+MARKETS_TOP_SIZE = max(1, min(int(os.environ.get("MARKETS_TOP_SIZE", TOP_PAGE_SIZE)), TOP_PAGE_SIZE * TOP_MAX_PAGES))
+# sort name: market table column; "default" keeps the watchlist first, then top coins by rank
+MARKET_SORTS = {
+    "default": None,
+    "market_cap": "market_cap",
+    "change_24h": "change_24h",
+    "change_7d": "change_7d",
+    "volume": "volume_24h",
+}
+MARKET_FILTERS = ("gainers", "losers")
+MARKETS_PAGE_SIZE = 18
+# Each rebuild swaps in a new dict; readers keep whichever index they were handed.
+_MARKET_INDEX = {"key": None, "rows": [], "watch": frozenset(), "sorted": {}}
+_MARKET_INDEX_LOCK = threading.Lock()
+MY_COINS_ORDER = ["smlo", "bitcoin", "solana", "polygon-ecosystem-token", "dogecoin", "litecoin", "binancecoin", "mantle", "nano", "banano", "atto"]
+_FETCH_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="crypto-fetch")
+_PERSIST_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crypto-persist")
+_PERSIST = {"pending": {}, "digests": {}}
+_PERSIST_LOCK = threading.Lock()
+REFRESH_LEAD_SECONDS = 5
+CACHE_WAIT_SECONDS = 12
+_INFLIGHT = {}
+_VERSION = {"last": 0}
+_VERSION_LOCK = threading.Lock()
+_CHANGED = threading.Condition()
+# Bumped under _CHANGED on every cache change, so waiters can tell whether they missed one.
+_CHANGE_SEQ = {"value": 0}
+SummarySnapshot = namedtuple("SummarySnapshot", "version etag data body gzipped")
+_SUMMARY = {"snapshot": None}
+_SUMMARY_LOCK = threading.Lock()
+_INFLIGHT_LOCK = threading.Lock()
+_REVALIDATE_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="crypto-revalidate")
+
+# namespace: (ttl, stale-while-revalidate window, stale-if-error max age) in seconds
+CACHE_POLICIES = {
+    "btc": (15, 60, 3600),
+    "top": (30, 120, 6 * 3600),
+    "my_coins": (30, 120, 6 * 3600),
+    "fear_greed": (300, 900, 24 * 3600),
+    "news": (NEWS_POLL_MIN_SECONDS, 3600, 24 * 3600),
+    "search": (10, 50, 600),
+}
+_REFRESH_RUNNING = set()
+_REFRESH_LOCK = threading.Lock()
+_REFRESH_STOP = threading.Event()
+_REFRESH_THREAD = None
+
+
+def _http_get(url, **kwargs):
+    # Every upstream call goes through the per-host rate limiter and circuit breaker.
+    return upstream.get(SESSION, url, **kwargs)
+
+
+def _cache_policy(key):
+    return CACHE_POLICIES.get(key.split(":", 1)[0], (30, 0, 0))
+
+
+def _cached(key, value_fn):
+    now = time.time()
+    hit = _CACHE.get(key)
+    namespace = key.split(":", 1)[0]
+    if hit:
+        ttl_seconds, stale_seconds, max_stale_seconds = _cache_policy(key)
+        age = now - hit["ts"]
+        if age < ttl_seconds:
+            metrics.CACHE_LOOKUPS.inc(namespace, "fresh")
+            return hit["value"]
+        if hit["value"] is not None:
+            if now - hit["checked"] < ttl_seconds and age < max_stale_seconds:
+                # Upstream failed recently: keep serving the last good value.
+                metrics.CACHE_LOOKUPS.inc(namespace, "stale_if_error")
+                return hit["value"]
+            if age < ttl_seconds + stale_seconds:
+                metrics.CACHE_LOOKUPS.inc(namespace, "stale")
+                _revalidate(key, value_fn)
+                return hit["value"]
+    metrics.CACHE_LOOKUPS.inc(namespace, "miss")
+    return _single_flight(key, value_fn, recheck=True)
+
+
+def _refresh(key, value_fn):
+    return _single_flight(key, value_fn)
+
+
+def _revalidate(key, value_fn):
+    with _INFLIGHT_LOCK:
+        if key in _INFLIGHT:
+            return
+    _REVALIDATE_EXECUTOR.submit(_single_flight, key, value_fn)
+
+
+def _single_flight(key, value_fn, recheck=False):
+    # One upstream fetch per key; concurrent callers wait for its result.
+    with _INFLIGHT_LOCK:
+        hit = _CACHE.peek(key)
+        if recheck and hit and (time.time() - hit["checked"] < _cache_policy(key)[0]):
+            return hit["value"]
+        flight = _INFLIGHT.get(key)
+        leader = flight is None
+        if leader:
+            flight = {"done": threading.Event(), "value": hit["value"] if hit else None}
+            _INFLIGHT[key] = flight
+    if not leader:
+        if flight["done"].wait(CACHE_WAIT_SECONDS):
+            return flight["value"]
+        return hit["value"] if hit else None
+    try:
+        value = _fetch_shared(key, value_fn) if _SHARED else _fetch(key, value_fn)
+        flight["value"] = value
+        return value
+    finally:
+        with _INFLIGHT_LOCK:
+            _INFLIGHT.pop(key, None)
+        flight["done"].set()
 
 
-def _cached(key, ttl_seconds, value_fn):
+def _fetch(key, value_fn):
     now = time.time()
-    hit = _CACHE.get(key)
-    if hit and (now - hit["ts"] < ttl_seconds):
+    try:
+        value = value_fn()
+    except Exception:
+        value = None
+    return _store(key, value, now)
+
+
+def _fetch_shared(key, value_fn):
+    # Only the worker holding the key's lease goes upstream; the others adopt its entry.
+    owner = str(os.getpid())
+    deadline = time.time() + CACHE_WAIT_SECONDS
+    while True:
+        shared = _SHARED.get(key)
+        if shared and time.time() < _refresh_due_at(shared, _cache_policy(key)[0]):
+            return _adopt(key, shared)
+        if _SHARED.try_lease(key, owner, CACHE_WAIT_SECONDS):
+            try:
+                value = _fetch(key, value_fn)
+                entry = _CACHE.peek(key)
+                if entry:
+                    _SHARED.set(key, entry)
+                return value
+            finally:
+                _SHARED.release(key, owner)
+        if time.time() >= deadline:
+            hit = _CACHE.peek(key)
+            return hit["value"] if hit else None
+        time.sleep(SHARED_POLL_SECONDS)
+
+
+def _adopt(key, entry):
+    hit = _CACHE.peek(key)
+    _CACHE.set(key, entry)
+    if not hit or hit["version"] != entry["version"]:
+        if entry["value"] is not None:
+            _index_markets(key, entry["value"])
+        _notify_change()
+    return entry["value"]
+
+
+def _next_version():
+    # Time based so every worker process (and a restarted one) hands out comparable versions.
+    with _VERSION_LOCK:
+        _VERSION["last"] = max(_VERSION["last"] + 1, int(time.time() * 1000000))
+        return _VERSION["last"]
+
+
+def _store(key, value, now):
+    ttl_seconds, stale_seconds, max_stale_seconds = _cache_policy(key)
+    hit = _CACHE.peek(key)
+    if value is None and hit and hit["value"] is not None and now - hit["ts"] < max_stale_seconds:
+        _CACHE.set(key, dict(hit, checked=now, error=True))
         return hit["value"]
-    value = value_fn()
-    _CACHE[key] = {"ts": now, "value": value}
+    expires = now + ttl_seconds + max(stale_seconds, max_stale_seconds)
+    changed = not (hit and hit["value"] == value)
+    version = _next_version() if changed else hit["version"]
+    _CACHE.set(
+        key,
+        {"ts": now, "checked": now, "expires": expires, "value": value, "error": value is None, "version": version},
+    )
+    if changed:
+        if value is not None:
+            _record_history(key, value)
+            _index_markets(key, value)
+        _notify_change()
     return value
 
 
-def load_holdings():
-    if os.path.exists(HOLDINGS_PATH):
-        try:
-            with open(HOLDINGS_PATH, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return []
-    return []
+def _record_history(key, value):
+    namespace = key.split(":", 1)[0]
+    if namespace == "btc":
+        price_history.record_samples([dict(value, id="bitcoin")])
+    elif namespace in ("top", "my_coins"):
+        price_history.record_samples(value)
 
 
-def save_holdings(items):
-    with open(HOLDINGS_PATH, "w", encoding="utf-8") as f:
-        json.dump(items, f, indent=2, ensure_ascii=False)
+def _index_markets(key, value):
+    namespace = key.split(":", 1)[0]
+    # Only the listed coins go into the table; search results are served straight from the cache.
+    if namespace in ("top", "my_coins"):
+        MARKETS.upsert(value)
+
+
+def _notify_change():
+    with _CHANGED:
+        _CHANGE_SEQ["value"] += 1
+        _CHANGED.notify_all()
+
+
+def cache_change_seq():
+    return _CHANGE_SEQ["value"]
 
 
-def load_suggestions():
-    if os.path.exists(SUGGESTIONS_PATH):
+def wait_for_cache_change(seq, timeout):
+    # Returns at once if anything changed after seq was read.
+    with _CHANGED:
+        return _CHANGED.wait_for(lambda: _CHANGE_SEQ["value"] != seq, timeout)
+
+
+def get_cache_version(*keys):
+    # Changes whenever the cached value behind any of the keys changes.
+    versions = []
+    for key in keys:
+        hit = _CACHE.peek(key)
+        if not hit or hit["value"] is None:
+            return None
+        versions.append(format(hit["version"], "x"))
+    return ".".join(versions)
+
+
+def _refresh_due(key, ttl_seconds, now):
+    hit = _CACHE.peek(key)
+    if not hit:
+        return now
+    return _refresh_due_at(hit, ttl_seconds)
+
+
+def _refresh_due_at(entry, ttl_seconds):
+    lead = min(REFRESH_LEAD_SECONDS, ttl_seconds * 0.2)
+    return entry["checked"] + ttl_seconds - lead
+
+
+def _run_refresh_job(key, value_fn):
+    try:
+        _refresh(key, value_fn)
+    except Exception:
+        pass
+    finally:
+        with _REFRESH_LOCK:
+            _REFRESH_RUNNING.discard(key)
+
+
+def _refresh_loop(executor):
+    while not _REFRESH_STOP.is_set():
+        now = time.time()
+        next_run = now + 60
+        for key, value_fn in _REFRESH_JOBS:
+            due = _refresh_due(key, _cache_policy(key)[0], now)
+            if due <= now:
+                with _REFRESH_LOCK:
+                    submit = key not in _REFRESH_RUNNING
+                    _REFRESH_RUNNING.add(key)
+                if submit:
+                    executor.submit(_run_refresh_job, key, value_fn)
+                due = now + 1
+            next_run = min(next_run, due)
+        _CACHE.sweep()
+        if _SHARED:
+            _SHARED.sweep()
+        _REFRESH_STOP.wait(max(0.5, next_run - time.time()))
+
+
+def start_background_refresh():
+    global _REFRESH_THREAD
+    if _REFRESH_THREAD and _REFRESH_THREAD.is_alive():
+        return _REFRESH_THREAD
+    _REFRESH_STOP.clear()
+    executor = ThreadPoolExecutor(max_workers=len(_REFRESH_JOBS) or 1, thread_name_prefix="crypto-refresh")
+    _REFRESH_THREAD = threading.Thread(target=_refresh_loop, args=(executor,), name="crypto-refresh", daemon=True)
+    _REFRESH_THREAD.start()
+    return _REFRESH_THREAD
+
+
+def stop_background_refresh():
+    _REFRESH_STOP.set()
+
+
+def _write_json_atomic(path, data, **dump_kwargs):
+    # Readers see either the old file or the new one, never a partial write.
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except OSError:
         try:
-            with open(SUGGESTIONS_PATH, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return []
-    return []
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
 
 
-def add_suggestion(email, message):
-    items = load_suggestions()
-    items.append(
-        {
-            "email": email,
-            "message": message,
-            "created": datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC"),
-            "status": "new",
-        }
-    )
-    with open(SUGGESTIONS_PATH, "w", encoding="utf-8") as f:
-        json.dump(items, f, indent=2, ensure_ascii=False)
-    return items
+def _persist_snapshot(path, items):
+    # Write-behind: the latest items per file are written by one background thread.
+    with _PERSIST_LOCK:
+        queued = path in _PERSIST["pending"]
+        _PERSIST["pending"][path] = (time.time(), items)
+    if not queued:
+        _PERSIST_EXECUTOR.submit(_write_snapshot, path)
 
 
-def update_suggestion_status(index, status):
-    items = load_suggestions()
-    if 0 <= index < len(items):
-        items[index]["status"] = status
-        with open(SUGGESTIONS_PATH, "w", encoding="utf-8") as f:
-            json.dump(items, f, indent=2, ensure_ascii=False)
-    return items
+def _write_snapshot(path):
+    with _PERSIST_LOCK:
+        fetched, items = _PERSIST["pending"].pop(path)
+    digest = hashlib.sha1(json.dumps(items, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+    if _PERSIST["digests"].get(path) == digest:
+        return
+    try:
+        _write_json_atomic(path, {"fetched": int(fetched), "items": items}, separators=(",", ":"))
+        _PERSIST["digests"][path] = digest
+    except (OSError, TypeError, ValueError):
+        pass
 
 
-def delete_suggestion(index):
-    items = load_suggestions()
-    if 0 <= index < len(items):
-        items.pop(index)
-        with open(SUGGESTIONS_PATH, "w", encoding="utf-8") as f:
-            json.dump(items, f, indent=2, ensure_ascii=False)
-    return items
+def read_cache_snapshot(path):
+    # Accepts the {"fetched", "items"} layout as well as the older bare list.
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return []
+    if isinstance(cached, dict):
+        cached = cached.get("items")
+    return cached if isinstance(cached, list) else []
+
+
+def _holdings_stat():
+    try:
+        st = os.stat(HOLDINGS_PATH)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _revalidate_holdings():
+    now = time.time()
+    if now - _HOLDINGS["checked"] < HOLDINGS_CHECK_SECONDS:
+        return
+    with _HOLDINGS_LOCK:
+        if now - _HOLDINGS["checked"] < HOLDINGS_CHECK_SECONDS:
+            return
+        _HOLDINGS["checked"] = now
+        stat = _holdings_stat()
+        if stat == _HOLDINGS["stat"]:
+            return
+        items = []
+        if stat is not None:
+            try:
+                with open(HOLDINGS_PATH, "r", encoding="utf-8") as f:
+                    items = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                # Keep serving the last good copy if the file was edited by hand badly.
+                if _HOLDINGS["stat"] is not None:
+                    return
+                items = []
+        _HOLDINGS["items"] = items if isinstance(items, list) else []
+        _HOLDINGS["stat"] = stat
+
+
+def load_holdings():
+    _revalidate_holdings()
+    return list(_HOLDINGS["items"])
+
+
+def _holdings_version(stat):
+    # Derived from the file itself, so every worker (and a restarted one) agrees on it.
+    return "none" if stat is None else f"{stat[0]:x}-{stat[1]:x}"
+
+
+def get_holdings_version():
+    _revalidate_holdings()
+    return _holdings_version(_HOLDINGS["stat"])
+
+
+def save_holdings(items):
+    with _HOLDINGS_LOCK:
+        _write_json_atomic(HOLDINGS_PATH, items, indent=2)
+        _HOLDINGS["items"] = list(items)
+        _HOLDINGS["stat"] = _holdings_stat()
+        _HOLDINGS["checked"] = time.time()
 
 
 def get_cache_snapshot():
-    snapshot = {}
+    entries = {}
     now = time.time()
     for key, value in _CACHE.items():
         age = int(now - value["ts"])
-        snapshot[key] = f"{age}s ago"
-    return snapshot
+        if value["error"]:
+            status = "error"
+        elif age >= _cache_policy(key)[0]:
+            status = "stale"
+        else:
+            status = "fresh"
+        entries[key] = {"age": f"{age}s ago", "age_seconds": age, "status": status, "bytes": _CACHE.size_of(key)}
+    feeds = {}
+    for source, feed_url in NEWS_FEEDS:
+        state = _FEED_STATE.get(feed_url) or {}
+        feeds[source] = {
+            "interval": int(state.get("interval") or 0),
+            "next_in": max(0, int(state.get("next_poll", now) - now)),
+            "failures": state.get("failures", 0),
+        }
+    return {"entries": entries, "stats": _CACHE.stats(), "upstreams": upstream.snapshot(), "feeds": feeds}
 
 
-def get_btc_data():
-    def _fetch():
-        headers = {"User-Agent": "JestagCryptoTools/1.0"}
-        url = "https://api.coingecko.com/api/v3/coins/bitcoin"
-        params = {
-            "localization": "false",
-            "tickers": "false",
-            "community_data": "false",
-            "developer_data": "false",
-            "sparkline": "true",
-            "market_data": "true",
+def _load_btc_data():
+    headers = {"User-Agent": "JestagCryptoTools/1.0"}
+    url = "https://api.coingecko.com/api/v3/coins/bitcoin"
+    params = {
+        "localization": "false",
+        "tickers": "false",
+        "community_data": "false",
+        "developer_data": "false",
+        "sparkline": "true",
+        "market_data": "true",
+    }
+    try:
+        resp = _http_get(url, params=params, headers=headers, timeout=10)
+        resp.raise_for_status()
+        data = resp.json()
+    except Exception:
+        data = None
+
+    if data:
+        market = data.get("market_data", {})
+        spark = market.get("sparkline_7d", {}).get("price", [])
+        image = data.get("image", {})
+        prices = market.get("current_price", {})
+        return {
+            "name": data.get("name", "Bitcoin"),
+            "symbol": data.get("symbol", "btc").upper(),
+            "image": image.get("small"),
+            "price_usd": prices.get("usd"),
+            "price_eur": prices.get("eur"),
+            "prices": {
+                "usd": prices.get("usd"),
+                "eur": prices.get("eur"),
+                "gbp": prices.get("gbp"),
+                "aud": prices.get("aud"),
+                "cad": prices.get("cad"),
+                "jpy": prices.get("jpy"),
+                "cny": prices.get("cny"),
+                "inr": prices.get("inr"),
+                "krw": prices.get("krw"),
+            },
+            "change_24h": market.get("price_change_percentage_24h"),
+            "volume_24h": market.get("total_volume", {}).get("usd"),
+            "market_cap": market.get("market_cap", {}).get("usd"),
+            "sparkline": spark[-60:] if len(spark) > 60 else spark,
+            "updated": datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC"),
         }
-        try:
-            resp = SESSION.get(url, params=params, headers=headers, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-        except Exception:
-            data = None
-
-        if data:
-            market = data.get("market_data", {})
-            spark = market.get("sparkline_7d", {}).get("price", [])
-            image = data.get("image", {})
-            prices = market.get("current_price", {})
-            return {
-                "name": data.get("name", "Bitcoin"),
-                "symbol": data.get("symbol", "btc").upper(),
-                "image": image.get("small"),
-                "price_usd": prices.get("usd"),
-                "price_eur": prices.get("eur"),
-                "prices": {
-                    "usd": prices.get("usd"),
-                    "eur": prices.get("eur"),
-                    "gbp": prices.get("gbp"),
-                    "aud": prices.get("aud"),
-                    "cad": prices.get("cad"),
-                    "jpy": prices.get("jpy"),
-                    "cny": prices.get("cny"),
-                    "inr": prices.get("inr"),
-                    "krw": prices.get("krw"),
-                },
-                "change_24h": market.get("price_change_percentage_24h"),
-                "volume_24h": market.get("total_volume", {}).get("usd"),
-                "market_cap": market.get("market_cap", {}).get("usd"),
-                "sparkline": spark[-60:] if len(spark) > 60 else spark,
-                "updated": datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC"),
-            }
 
-        fallback_url = "https://api.coingecko.com/api/v3/simple/price"
-        fallback_params = {
-            "ids": "bitcoin",
-            "vs_currencies": "usd,eur",
-            "include_24hr_change": "true",
-            "include_24hr_vol": "true",
-            "include_market_cap": "true",
+    fallback_url = "https://api.coingecko.com/api/v3/simple/price"
+    fallback_params = {
+        "ids": "bitcoin",
+        "vs_currencies": "usd,eur",
+        "include_24hr_change": "true",
+        "include_24hr_vol": "true",
+        "include_market_cap": "true",
+    }
+    try:
+        resp = _http_get(fallback_url, params=fallback_params, headers=headers, timeout=10)
+        resp.raise_for_status()
+        data = resp.json().get("bitcoin", {})
+        return {
+            "name": "Bitcoin",
+            "symbol": "BTC",
+            "image": None,
+            "price_usd": data.get("usd"),
+            "price_eur": data.get("eur"),
+            "prices": {
+                "usd": data.get("usd"),
+                "eur": data.get("eur"),
+                "gbp": data.get("gbp"),
+                "aud": data.get("aud"),
+                "cad": data.get("cad"),
+                "jpy": data.get("jpy"),
+                "cny": data.get("cny"),
+                "inr": data.get("inr"),
+                "krw": data.get("krw"),
+            },
+            "change_24h": data.get("usd_24h_change"),
+            "volume_24h": data.get("usd_24h_vol"),
+            "market_cap": data.get("usd_market_cap"),
+            "sparkline": [point[1] for point in price_history.get_history("bitcoin", "7d")][-60:],
+            "updated": datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC"),
         }
-        try:
-            resp = SESSION.get(fallback_url, params=fallback_params, headers=headers, timeout=10)
-            resp.raise_for_status()
-            data = resp.json().get("bitcoin", {})
-            return {
-                "name": "Bitcoin",
-                "symbol": "BTC",
-                "image": None,
-                "price_usd": data.get("usd"),
-                "price_eur": data.get("eur"),
-                "prices": {
-                    "usd": data.get("usd"),
-                    "eur": data.get("eur"),
-                    "gbp": data.get("gbp"),
-                    "aud": data.get("aud"),
-                    "cad": data.get("cad"),
-                    "jpy": data.get("jpy"),
-                    "cny": data.get("cny"),
-                    "inr": data.get("inr"),
-                    "krw": data.get("krw"),
-                },
-                "change_24h": data.get("usd_24h_change"),
-                "volume_24h": data.get("usd_24h_vol"),
-                "market_cap": data.get("usd_market_cap"),
-                "sparkline": [],
-                "updated": datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC"),
-            }
-        except Exception:
-            return None
+    except Exception:
+        return None
 
-    return _cached("btc", 15, _fetch)
 
+def get_btc_data():
+    return _cached("btc", _load_btc_data)
 
-def get_top_coins(limit=50):
-    def _fetch():
-        headers = {"User-Agent": "JestagCryptoTools/1.0"}
-        url = "https://api.coingecko.com/api/v3/coins/markets"
-        per_page = max(1, min(int(limit), 250))
-        params = {
-            "vs_currency": "usd",
-            "order": "market_cap_desc",
-            "per_page": per_page,
-            "page": 1,
-            "sparkline": "false",
-            "price_change_percentage": "24h,7d",
-        }
-        try:
-            resp = SESSION.get(url, params=params, headers=headers, timeout=10)
-            resp.raise_for_status()
-            items = resp.json()
-        except Exception:
-            items = None
-
-        if items:
-            results = []
-            for item in items[:limit]:
-                results.append(
-                    {
-                        "id": item.get("id"),
-                        "name": item.get("name"),
-                        "symbol": (item.get("symbol") or "").upper(),
-                        "image": item.get("image"),
-                        "price_usd": item.get("current_price"),
-                        "change_24h": item.get("price_change_percentage_24h"),
-                        "change_7d": item.get("price_change_percentage_7d_in_currency"),
-                        "volume_24h": item.get("total_volume"),
-                        "market_cap": item.get("market_cap"),
-                        "rank": item.get("market_cap_rank"),
-                    }
-                )
-            try:
-                with open(TOP_COINS_CACHE, "w", encoding="utf-8") as f:
-                    json.dump(results, f, indent=2, ensure_ascii=False)
-            except OSError:
-                pass
-            return results
-        return None
 
-    items = _cached(f"top_{limit}", 30, _fetch)
+def _load_top_page(page):
+    headers = {"User-Agent": "JestagCryptoTools/1.0"}
+    url = "https://api.coingecko.com/api/v3/coins/markets"
+    params = {
+        "vs_currency": "usd",
+        "order": "market_cap_desc",
+        "per_page": TOP_PAGE_SIZE,
+        "page": page,
+        "sparkline": "false",
+        "price_change_percentage": "24h,7d",
+    }
+    try:
+        resp = _http_get(url, params=params, headers=headers, timeout=10)
+        resp.raise_for_status()
+        items = resp.json()
+    except Exception:
+        items = None
+
     if items:
-        return items
+        results = [market_record(item) for item in items]
+        _persist_snapshot(_top_page_path(page), results)
+        return results
+    return None
 
-    if os.path.exists(TOP_COINS_CACHE):
-        try:
-            with open(TOP_COINS_CACHE, "r", encoding="utf-8") as f:
-                cached = json.load(f)
-            if isinstance(cached, list) and cached:
-                if len(cached) >= limit:
-                    return cached[:limit]
-                # cached list too small for requested limit, fall through to fetch fresh
-        except (OSError, json.JSONDecodeError):
-            pass
+
+def _top_page_path(page):
+    return TOP_COINS_CACHE if page == 1 else f"top_coins_cache_{page}.json"
+
+
+def _top_page_keys(limit):
+    return [f"top:{page}" for page in range(1, (limit - 1) // TOP_PAGE_SIZE + 2)]
+
+
+def _top_page(page):
+    # Each page falls back to its own snapshot, so one failing page doesn't cut the list short.
+    return _cached(f"top:{page}", lambda: _load_top_page(page)) or read_cache_snapshot(_top_page_path(page))
+
+
+def get_top_coins(limit=50):
+    # Every limit is a slice of the same ranked pages, each cached on its own.
+    limit = max(1, min(int(limit), TOP_PAGE_SIZE * TOP_MAX_PAGES))
+    page_count = len(_top_page_keys(limit))
+    if page_count == 1:
+        pages = [_top_page(1)]
+    else:
+        futures = [_FETCH_EXECUTOR.submit(_top_page, page) for page in range(1, page_count + 1)]
+        pages = [future.result() for future in futures]
+    items = []
+    seen = set()
+    for page_items in pages:
+        if not page_items:
+            break
+        # Coins can move across a page boundary between two page refreshes.
+        items.extend(coin for coin in page_items if coin.get("id") not in seen)
+        seen.update(coin.get("id") for coin in page_items)
+    if items:
+        return items[:limit]
 
     btc = get_btc_data()
     return [btc] if btc else []
@@ -252,10 +637,10 @@ def search_coins(query, limit=6):
     query = (query or "").strip()
     if not query:
         return []
-    cache_key = f"search:{query.lower()}:{limit}"
-    hit = _CACHE.get(cache_key)
-    if hit and (time.time() - hit["ts"] < 10):
-        return hit["value"]
+    return _cached(f"search:{query.lower()}:{limit}", lambda: _load_search(query, limit))
+
+
+def _load_search(query, limit):
     headers = {"User-Agent": "JestagCryptoTools/1.0"}
     q_lower = query.lower()
     alias_map = {
@@ -273,7 +658,7 @@ def search_coins(query, limit=6):
     search_url = "https://api.coingecko.com/api/v3/search"
     ids = []
     try:
-        resp = SESSION.get(search_url, params={"query": query}, headers=headers, timeout=10)
+        resp = _http_get(search_url, params={"query": query}, headers=headers, timeout=10)
         resp.raise_for_status()
         data = resp.json()
         coins = data.get("coins", [])[:limit]
@@ -300,7 +685,7 @@ def search_coins(query, limit=6):
         "price_change_percentage": "24h,7d",
     }
     try:
-        resp = SESSION.get(markets_url, params=params, headers=headers, timeout=10)
+        resp = _http_get(markets_url, params=params, headers=headers, timeout=10)
         resp.raise_for_status()
         items = resp.json()
     except Exception:
@@ -308,98 +693,92 @@ def search_coins(query, limit=6):
         if not items:
             return []
 
-    results = []
-    for item in items:
-        results.append(
-            {
-                "id": item.get("id"),
-                "name": item.get("name"),
-                "symbol": (item.get("symbol") or "").upper(),
-                "image": item.get("image"),
-                "price_usd": item.get("current_price") if item.get("current_price") is not None else item.get("price_usd"),
-                "change_24h": item.get("price_change_percentage_24h") if item.get("price_change_percentage_24h") is not None else item.get("change_24h"),
-                "change_7d": item.get("price_change_percentage_7d_in_currency") if item.get("price_change_percentage_7d_in_currency") is not None else item.get("change_7d"),
-                "volume_24h": item.get("total_volume") if item.get("total_volume") is not None else item.get("volume_24h"),
-                "market_cap": item.get("market_cap"),
-                "rank": item.get("market_cap_rank") if item.get("market_cap_rank") is not None else item.get("rank"),
-            }
-        )
-    _CACHE[cache_key] = {"ts": time.time(), "value": results}
-    return results
+    return [market_record(item) for item in items]
 
 
-def _search_coin_list_cache(query, limit=6):
-    query = query.lower()
+def _coin_list_index():
     now = int(time.time())
-    coins = []
-    if os.path.exists(COINGECKO_LIST_CACHE):
-        try:
-            with open(COINGECKO_LIST_CACHE, "r", encoding="utf-8") as f:
-                payload = json.load(f)
-            if isinstance(payload, dict):
-                updated = int(payload.get("updated", 0))
-                if now - updated < 24 * 60 * 60:
-                    coins = payload.get("coins", [])
-        except (OSError, json.JSONDecodeError, ValueError):
-            coins = []
-
-    if not coins:
+    with _COIN_INDEX_LOCK:
         try:
-            resp = SESSION.get("https://api.coingecko.com/api/v3/coins/list", headers={"User-Agent": "JestagCryptoTools/1.0"}, timeout=10)
-            resp.raise_for_status()
-            coins = resp.json()
-            with open(COINGECKO_LIST_CACHE, "w", encoding="utf-8") as f:
-                json.dump({"updated": now, "coins": coins}, f)
-        except Exception:
-            return []
+            mtime = os.path.getmtime(COINGECKO_LIST_CACHE)
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime != _COIN_INDEX["mtime"]:
+            _COIN_INDEX["mtime"] = mtime
+            try:
+                with open(COINGECKO_LIST_CACHE, "r", encoding="utf-8") as f:
+                    payload = json.load(f)
+                if isinstance(payload, dict):
+                    updated = int(payload.get("updated", 0))
+                    if updated != _COIN_INDEX["updated"] or _COIN_INDEX["index"] is None:
+                        _COIN_INDEX["index"] = CoinIndex(payload.get("coins", []))
+                        _COIN_INDEX["updated"] = updated
+            except (OSError, json.JSONDecodeError, ValueError):
+                pass
 
-    matches = []
-    for c in coins:
-        name = (c.get("name") or "").lower()
-        sym = (c.get("symbol") or "").lower()
-        if query in name or query == sym or sym.startswith(query):
-            if c.get("id"):
-                matches.append(c.get("id"))
-        if len(matches) >= limit:
-            break
-    return matches
+        index = _COIN_INDEX["index"]
+        if index is not None and now - _COIN_INDEX["updated"] < 24 * 60 * 60:
+            return index
+        if now - _COIN_INDEX["attempted"] < COIN_LIST_RETRY_SECONDS:
+            return index
+        # Claiming the attempt makes this thread the only fetcher; the others keep
+        # serving the current index instead of waiting on the download.
+        _COIN_INDEX["attempted"] = now
+
+    try:
+        resp = _http_get("https://api.coingecko.com/api/v3/coins/list", headers={"User-Agent": "JestagCryptoTools/1.0"}, timeout=10)
+        resp.raise_for_status()
+        coins = resp.json()
+    except Exception:
+        return index
+    fresh = CoinIndex(coins)
+    with _COIN_INDEX_LOCK:
+        _COIN_INDEX["index"] = fresh
+        _COIN_INDEX["updated"] = now
+    try:
+        _write_json_atomic(COINGECKO_LIST_CACHE, {"updated": now, "coins": coins})
+        mtime = os.path.getmtime(COINGECKO_LIST_CACHE)
+    except OSError:
+        return fresh
+    with _COIN_INDEX_LOCK:
+        _COIN_INDEX["mtime"] = mtime
+    return fresh
+
+
+def _search_coin_list_cache(query, limit=6):
+    index = _coin_list_index()
+    if index is None:
+        return []
+    return index.search(query, limit=limit)
 
 
 def _search_cache_by_ids(ids):
     results = []
     for path in (TOP_COINS_CACHE, MY_COINS_CACHE):
-        if not os.path.exists(path):
-            continue
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                cached = json.load(f)
-            if not isinstance(cached, list):
-                continue
-            cmap = {c.get("id"): c for c in cached if c.get("id")}
-            for cid in ids:
-                if cid in cmap and cmap[cid] not in results:
-                    results.append(cmap[cid])
-        except (OSError, json.JSONDecodeError):
-            pass
+        cmap = {c.get("id"): c for c in read_cache_snapshot(path) if c.get("id")}
+        for cid in ids:
+            if cid in cmap and cmap[cid] not in results:
+                results.append(cmap[cid])
     return results
 
 
-def get_fear_greed():
-    def _fetch():
-        url = "https://api.alternative.me/fng/"
-        try:
-            resp = SESSION.get(url, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-            item = data.get("data", [{}])[0]
-            return {
-                "value": int(item.get("value", 0)),
-                "classification": item.get("value_classification", ""),
-            }
-        except Exception:
-            return None
+def _load_fear_greed():
+    url = "https://api.alternative.me/fng/"
+    try:
+        resp = _http_get(url, timeout=10)
+        resp.raise_for_status()
+        data = resp.json()
+        item = data.get("data", [{}])[0]
+        return {
+            "value": int(item.get("value", 0)),
+            "classification": item.get("value_classification", ""),
+        }
+    except Exception:
+        return None
+
 
-    return _cached("fear_greed", 300, _fetch)
+def get_fear_greed():
+    return _cached("fear_greed", _load_fear_greed)
 
 
 def market_mood(change_24h):
@@ -416,276 +795,411 @@ def market_mood(change_24h):
     return "Calm"
 
 
-def get_my_coins():
+def _summary_data():
+    btc = get_btc_data()
+    my_coins = get_my_coins()
+    if my_coins:
+        my_map = {coin.get("id"): coin for coin in my_coins}
+        my_coins = [my_map[i] for i in MY_COINS_ORDER if i in my_map] + [c for c in my_coins if c.get("id") not in MY_COINS_ORDER]
+    return {
+        "btc": btc,
+        "top_coins": get_top_coins(),
+        "my_coins": my_coins,
+        "fear_greed": get_fear_greed(),
+        "mood": market_mood(btc.get("change_24h") if btc else None),
+    }
+
+
+def get_summary_snapshot():
+    # The summary payload is encoded (and gzipped) once per data version and
+    # shared by /api/summary, /api/stream and the home page.
+    get_btc_data()
+    get_top_coins()
+    get_my_coins()
+    get_fear_greed()
+    version = get_cache_version("btc", "top:1", "my_coins", "fear_greed")
+    snapshot = _SUMMARY["snapshot"]
+    if version is not None and snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _SUMMARY_LOCK:
+        snapshot = _SUMMARY["snapshot"]
+        if version is not None and snapshot is not None and snapshot.version == version:
+            return snapshot
+        data = _summary_data()
+        body = json.dumps(data, separators=(",", ":"), sort_keys=True).encode("utf-8")
+        snapshot = SummarySnapshot(
+            version=version,
+            etag=version and f"summary-{version}",
+            data=data,
+            body=body,
+            gzipped=gzip.compress(body, compresslevel=6, mtime=0),
+        )
+        if version is not None:
+            _SUMMARY["snapshot"] = snapshot
+        return snapshot
+
+
+def _smlo_from_cache():
+    return next((c for c in read_cache_snapshot(MY_COINS_CACHE) if c.get("id") == "smlo"), None)
+
+
+def _fetch_smlo_pool(timeout):
     headers = {"User-Agent": "JestagCryptoTools/1.0"}
     pool_id = "9FepPyQDMBvj4bcLrfCUhK9pyLk8WoTDNkvgSCR86aWp"
     url = f"https://api.geckoterminal.com/api/v2/networks/solana/pools/{pool_id}"
-    nestex_url = "https://trade.nestex.one/api/cg/tickers"
     params = {"include": "base_token,quote_token"}
-    results = []
-    hit = _CACHE.get("my_coins")
-    if hit and (time.time() - hit["ts"] < 30):
-        return hit["value"]
+    resp = _http_get(url, params=params, headers=headers, timeout=timeout)
+    resp.raise_for_status()
+    data = resp.json()
+    pool_attr = data.get("data", {}).get("attributes", {})
+    relationships = data.get("data", {}).get("relationships", {})
+    included = data.get("included", [])
+    base_id = relationships.get("base_token", {}).get("data", {}).get("id")
+    base_token = next((item for item in included if item.get("type") == "token" and item.get("id") == base_id), {})
+    return pool_attr, base_token.get("attributes", {})
+
+
+def _fetch_nestex_volume(timeout):
+    headers = {"User-Agent": "JestagCryptoTools/1.0"}
+    nestex = _http_get("https://trade.nestex.one/api/cg/tickers", headers=headers, timeout=timeout).json()
+    for item in nestex:
+        if item.get("ticker_id") == "SMLO_USDT":
+            return float(item.get("target_volume") or 0)
+    return 0.0
 
-    def _store(value):
-        _CACHE["my_coins"] = {"ts": time.time(), "value": value}
-        return value
 
-    def load_smlo_from_cache():
-        if os.path.exists(MY_COINS_CACHE):
-            try:
-                with open(MY_COINS_CACHE, "r", encoding="utf-8") as f:
-                    cached = json.load(f)
-                if isinstance(cached, list):
-                    return next((c for c in cached if c.get("id") == "smlo"), None)
-            except (OSError, json.JSONDecodeError):
-                return None
-        return None
+def _fetch_markets_by_ids(ids, timeout):
+    headers = {"User-Agent": "JestagCryptoTools/1.0"}
+    params = {
+        "vs_currency": "usd",
+        "ids": ",".join(ids),
+        "order": "market_cap_desc",
+        "per_page": len(ids),
+        "page": 1,
+        "sparkline": "false",
+        "price_change_percentage": "24h,7d",
+    }
+    resp = _http_get("https://api.coingecko.com/api/v3/coins/markets", params=params, headers=headers, timeout=timeout)
+    resp.raise_for_status()
+    return {item.get("id"): item for item in resp.json()}
+
 
+def _future_result(future, default=None):
+    if not future.done():
+        return default
     try:
-        # SMLO from GeckoTerminal pool + Nestex volume (kept first)
-        resp = SESSION.get(url, params=params, headers=headers, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        pool_attr = data.get("data", {}).get("attributes", {})
-        relationships = data.get("data", {}).get("relationships", {})
-        included = data.get("included", [])
-        base_id = relationships.get("base_token", {}).get("data", {}).get("id")
-        base_token = next((item for item in included if item.get("type") == "token" and item.get("id") == base_id), {})
-        base_attr = base_token.get("attributes", {})
-
-        nestex_volume = 0.0
+        return future.result()
+    except Exception:
+        return default
+
+
+def _load_my_coins():
+    deadline = time.time() + MY_COINS_DEADLINE_SECONDS
+    core_ids = [i for i in MY_COINS_ORDER if i != "smlo"]
+    timeout = min(10, MY_COINS_DEADLINE_SECONDS)
+    # GeckoTerminal pool, Nestex volume and CoinGecko markets are independent.
+    pool_future = _FETCH_EXECUTOR.submit(_fetch_smlo_pool, timeout)
+    nestex_future = _FETCH_EXECUTOR.submit(_fetch_nestex_volume, timeout)
+    markets_future = _FETCH_EXECUTOR.submit(_fetch_markets_by_ids, core_ids, timeout)
+    wait([pool_future, nestex_future, markets_future], timeout=max(0, deadline - time.time()))
+
+    results = []
+    pool = _future_result(pool_future)
+    if pool:
+        pool_attr, base_attr = pool
+        nestex_volume = _future_result(nestex_future, 0.0)
+        results.append(
+            {
+                "id": "smlo",
+                "name": base_attr.get("name") or "Smellow",
+                "symbol": (base_attr.get("symbol") or "SMLO").upper(),
+                "image": base_attr.get("image_url"),
+                "price_usd": float(pool_attr.get("base_token_price_usd") or 0),
+                "change_24h": float(pool_attr.get("price_change_percentage", {}).get("h24") or 0),
+                "change_7d": float(pool_attr.get("price_change_percentage", {}).get("d7") or 0),
+                "volume_24h": float(pool_attr.get("volume_usd", {}).get("h24") or 0) + nestex_volume,
+                "market_cap": float(pool_attr.get("fdv_usd") or 0),
+                "rank": None,
+            }
+        )
+
+    cg_data = _future_result(markets_future, {})
+    missing = [coin_id for coin_id in core_ids if coin_id not in cg_data]
+    remaining = deadline - time.time()
+    if missing and remaining > 1:
+        # Retry everything the first call did not return as one batched request.
         try:
-            nestex = SESSION.get(nestex_url, headers=headers, timeout=10).json()
-            for item in nestex:
-                if item.get("ticker_id") == "SMLO_USDT":
-                    nestex_volume = float(item.get("target_volume") or 0)
-                    break
+            cg_data.update(_fetch_markets_by_ids(missing, min(10, remaining)))
         except Exception:
-            nestex_volume = 0.0
-
-        smlo_entry = {
-            "id": "smlo",
-            "name": base_attr.get("name") or "Smellow",
-            "symbol": (base_attr.get("symbol") or "SMLO").upper(),
-            "image": base_attr.get("image_url"),
-            "price_usd": float(pool_attr.get("base_token_price_usd") or 0),
-            "change_24h": float(pool_attr.get("price_change_percentage", {}).get("h24") or 0),
-            "change_7d": float(pool_attr.get("price_change_percentage", {}).get("d7") or 0),
-            "volume_24h": float(pool_attr.get("volume_usd", {}).get("h24") or 0) + nestex_volume,
-            "market_cap": float(pool_attr.get("fdv_usd") or 0),
-            "rank": None,
-        }
-        results.append(smlo_entry)
-
-        # Core coins from CoinGecko (ordered)
-        core_order = [
-            "bitcoin",
-            "solana",
-            "polygon-ecosystem-token",
-            "dogecoin",
-            "litecoin",
-            "binancecoin",
-            "mantle",
-            "nano",
-            "banano",
-            "atto",
-        ]
-        cg_url = "https://api.coingecko.com/api/v3/coins/markets"
-        cg_params = {
-            "vs_currency": "usd",
-            "ids": ",".join(core_order),
-            "order": "market_cap_desc",
-            "per_page": len(core_order),
-            "page": 1,
-            "sparkline": "false",
-            "price_change_percentage": "24h,7d",
-        }
-        cg_resp = SESSION.get(cg_url, params=cg_params, headers=headers, timeout=10)
-        cg_resp.raise_for_status()
-        cg_data = {item.get("id"): item for item in cg_resp.json()}
-        missing = []
-        for coin_id in core_order:
-            item = cg_data.get(coin_id)
-            if not item:
-                missing.append(coin_id)
+            pass
+
+    for coin_id in core_ids:
+        item = cg_data.get(coin_id)
+        if item:
+            results.append(dict(market_record(item, default=0.0), id=coin_id))
+
+    if not results:
+        return None
+    if not pool:
+        cached_smlo = _smlo_from_cache()
+        if cached_smlo:
+            results = [cached_smlo] + results
+    _persist_snapshot(MY_COINS_CACHE, results)
+    return results
+
+
+def get_my_coins():
+    items = _cached("my_coins", _load_my_coins)
+    if items:
+        return items
+
+    cached = read_cache_snapshot(MY_COINS_CACHE)
+    cmap = {c.get("id"): c for c in cached}
+    return [cmap[i] for i in MY_COINS_ORDER if i in cmap] + [c for c in cached if c.get("id") not in MY_COINS_ORDER]
+
+
+def _market_index():
+    # Sorted row lists for every sort/order, rebuilt only when the listed coins change.
+    global _MARKET_INDEX
+    mine = get_my_coins()
+    top = get_top_coins(MARKETS_TOP_SIZE)
+    key = (get_cache_version(*_top_page_keys(MARKETS_TOP_SIZE), "my_coins"), MARKETS.version)
+    with _MARKET_INDEX_LOCK:
+        if key[0] is not None and _MARKET_INDEX["key"] == key:
+            return _MARKET_INDEX
+        # File fallbacks never went through the cache, so make sure their rows exist.
+        MARKETS.upsert([coin for coin in mine + top if coin.get("id") not in MARKETS.row_of])
+        ids = list(dict.fromkeys(coin.get("id") for coin in mine + top if coin.get("id")))
+        rows = [MARKETS.row_of[cid] for cid in ids]
+        index = {"key": key, "rows": rows, "watch": frozenset(rows[: len(mine)]), "sorted": {}}
+        for sort, field in MARKET_SORTS.items():
+            if field is None:
+                index["sorted"][sort, True] = rows
+                index["sorted"][sort, False] = rows[::-1]
                 continue
-            results.append(
-                {
-                    "id": coin_id,
-                    "name": item.get("name"),
-                    "symbol": (item.get("symbol") or "").upper(),
-                    "image": item.get("image"),
-                    "price_usd": float(item.get("current_price") or 0),
-                    "change_24h": float(item.get("price_change_percentage_24h") or 0),
-                    "change_7d": float(item.get("price_change_percentage_7d_in_currency") or 0),
-                    "volume_24h": float(item.get("total_volume") or 0),
-                    "market_cap": float(item.get("market_cap") or 0),
-                    "rank": item.get("market_cap_rank"),
-                }
-            )
+            column = MARKETS.columns[field]
+            # Coins without a value sort last in both directions.
+            index["sorted"][sort, True] = sorted(rows, key=lambda r: (math.isnan(column[r]), -column[r]))
+            index["sorted"][sort, False] = sorted(rows, key=lambda r: (math.isnan(column[r]), column[r]))
+        _MARKET_INDEX = index
+        return index
+
+
+def get_markets_page(sort="default", descending=True, min_market_cap=None, change=None, watchlist=False, cursor=None, limit=MARKETS_PAGE_SIZE):
+    index = _market_index()
+    rows = index["sorted"][sort, descending]
+    start = 0
+    if cursor:
+        # The cursor is the id of the last coin on the previous page. If that coin
+        # has left the list there is no "after it"; restarting at the top would
+        # append page one again, so the page is empty instead.
+        row = MARKETS.row_of.get(cursor)
+        if row is None or row not in rows:
+            return {"items": [], "next_cursor": None}
+        start = rows.index(row) + 1
+    caps = MARKETS.columns["market_cap"]
+    changes = MARKETS.columns["change_24h"]
+    items = []
+    next_cursor = None
+    for row in rows[start:]:
+        if watchlist and row not in index["watch"]:
+            continue
+        if min_market_cap is not None and not caps[row] >= min_market_cap:
+            continue
+        if change == "gainers" and not changes[row] > 0:
+            continue
+        if change == "losers" and not changes[row] < 0:
+            continue
+        if len(items) == limit:
+            next_cursor = items[-1]["id"]
+            break
+        items.append(MARKETS.record(row))
+    return {"items": items, "next_cursor": next_cursor}
 
-        # Fallback: fetch missing coins one-by-one
-        if missing:
-            for coin_id in missing:
-                try:
-                    one_params = {
-                        "vs_currency": "usd",
-                        "ids": coin_id,
-                        "order": "market_cap_desc",
-                        "per_page": 1,
-                        "page": 1,
-                        "sparkline": "false",
-                        "price_change_percentage": "24h,7d",
-                    }
-                    one_resp = SESSION.get(cg_url, params=one_params, headers=headers, timeout=10)
-                    one_resp.raise_for_status()
-                    one = one_resp.json()
-                    if not one:
-                        continue
-                    item = one[0]
-                    results.append(
-                        {
-                            "id": coin_id,
-                            "name": item.get("name"),
-                            "symbol": (item.get("symbol") or "").upper(),
-                            "image": item.get("image"),
-                            "price_usd": float(item.get("current_price") or 0),
-                            "change_24h": float(item.get("price_change_percentage_24h") or 0),
-                            "change_7d": float(item.get("price_change_percentage_7d_in_currency") or 0),
-                            "volume_24h": float(item.get("total_volume") or 0),
-                            "market_cap": float(item.get("market_cap") or 0),
-                            "rank": item.get("market_cap_rank"),
-                        }
-                    )
-                except Exception:
-                    pass
-
-        if results:
-            order = ["smlo", "bitcoin", "solana", "polygon-ecosystem-token", "dogecoin", "litecoin", "binancecoin", "mantle", "nano", "banano", "atto"]
-            rmap = {c.get("id"): c for c in results}
-            results = [rmap[i] for i in order if i in rmap] + [c for c in results if c.get("id") not in order]
-            if "smlo" not in rmap:
-                cached_smlo = load_smlo_from_cache()
-                if cached_smlo:
-                    results = [cached_smlo] + results
-            try:
-                with open(MY_COINS_CACHE, "w", encoding="utf-8") as f:
-                    json.dump(results, f, indent=2, ensure_ascii=False)
-            except OSError:
-                pass
-            return _store(results)
-    except Exception:
-        pass
 
-    if os.path.exists(MY_COINS_CACHE):
-        try:
-            with open(MY_COINS_CACHE, "r", encoding="utf-8") as f:
-                cached = json.load(f)
-            if isinstance(cached, list) and cached:
-                order = ["smlo", "bitcoin", "solana", "polygon-ecosystem-token", "dogecoin", "litecoin", "binancecoin", "mantle", "nano", "banano", "atto"]
-                cmap = {c.get("id"): c for c in cached}
-                cached = [cmap[i] for i in order if i in cmap] + [c for c in cached if c.get("id") not in order]
-                return _store(cached)
-        except (OSError, json.JSONDecodeError):
-            pass
+def get_markets_version():
+    _market_index()
+    version = get_cache_version(*_top_page_keys(MARKETS_TOP_SIZE), "my_coins")
+    return version and f"{version}-{MARKETS.version}"
 
-    return _store([])
 
+def _clean_text(text):
+    if not text:
+        return ""
+    text = html.unescape(text)
+    text = re.sub(r"<[^>]+>", "", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
 
-def get_crypto_news(limit=10):
-    hit = _CACHE.get("news")
-    if hit and (time.time() - hit["ts"] < 3600):
-        return hit["value"]
 
-    def _store(value):
-        _CACHE["news"] = {"ts": time.time(), "value": value}
-        return value
+def _news_key(entry):
+    return entry.get("link") or entry.get("url") or entry.get("id") or entry.get("title")
 
-    def clean_text(text):
-        if not text:
-            return ""
-        text = html.unescape(text)
-        text = re.sub(r"<[^>]+>", "", text)
-        text = re.sub(r"\s+", " ", text).strip()
-        return text
-
-    feeds = [
-        ("CoinDesk", "https://www.coindesk.com/arc/outboundfeeds/rss/"),
-        ("Cointelegraph", "https://cointelegraph.com/rss"),
-        ("The Block", "https://www.theblock.co/rss.xml"),
-        ("Reddit r/CryptoCurrency", "https://www.reddit.com/r/CryptoCurrency/.rss"),
-        ("Reddit r/Bitcoin", "https://www.reddit.com/r/Bitcoin/.rss"),
-    ]
-    results = []
+
+def _news_items(source, entries, limit):
+    items = []
+    for entry in entries[:limit]:
+        known = _NEWS_STORE["items"].get(_news_key(entry))
+        if known is not None:
+            # Already parsed and cleaned on an earlier refresh.
+            items.append(known)
+            continue
+        image_url = None
+        media_thumb = entry.get("media_thumbnail")
+        media_content = entry.get("media_content")
+        if media_thumb and isinstance(media_thumb, list):
+            image_url = media_thumb[0].get("url")
+        if not image_url and media_content and isinstance(media_content, list):
+            image_url = media_content[0].get("url")
+
+        published_struct = entry.get("published_parsed") or entry.get("updated_parsed")
+        if published_struct:
+            published_ts = int(time.mktime(published_struct))
+            published_str = datetime.fromtimestamp(published_ts, tz=timezone.utc).strftime(
+                "%Y-%m-%d %H:%M UTC"
+            )
+        else:
+            published_ts = None
+            published_str = "Unknown time"
+        if not published_ts or published_ts < time.time() - NEWS_MAX_AGE_SECONDS:
+            # Would be dropped by the store anyway; skip the HTML cleanup.
+            continue
+        summary_raw = entry.get("summary") or entry.get("description")
+        if not summary_raw:
+            content = entry.get("content")
+            if isinstance(content, list) and content:
+                summary_raw = content[0].get("value")
+        summary = _clean_text(summary_raw)
+        items.append(
+            {
+                "title": entry.get("title", "Untitled"),
+                "source": source,
+                "summary": summary or "Summary unavailable.",
+                "image": image_url,
+                "url": entry.get("link"),
+                "published_ts": published_ts,
+                "published_str": published_str,
+            }
+        )
+    return items
+
+
+def _feed_interval(state, items, fresh):
+    if state.get("failures"):
+        return min(NEWS_POLL_MIN_SECONDS * 2 ** state["failures"], NEWS_POLL_MAX_SECONDS)
+    if not fresh and state.get("interval"):
+        # Nothing new since the last poll: wait longer next time.
+        return min(state["interval"] * NEWS_POLL_IDLE_FACTOR, NEWS_POLL_MAX_SECONDS)
+    stamps = sorted((item["published_ts"] for item in items if item.get("published_ts")), reverse=True)[:10]
+    if len(stamps) < 2:
+        return NEWS_POLL_DEFAULT_SECONDS
+    # Poll about once per average gap between the feed's recent posts.
+    gap = (stamps[0] - stamps[-1]) / (len(stamps) - 1)
+    return max(NEWS_POLL_MIN_SECONDS, min(gap, NEWS_POLL_MAX_SECONDS))
+
+
+def _fetch_feed(source, feed_url, limit, timeout):
+    # Conditional GET: an unchanged feed answers 304 and reuses the last parse.
+    state = _FEED_STATE.setdefault(feed_url, {})
+    headers = {"User-Agent": "JestagCryptoTools/1.0"}
+    if state.get("items") is not None:
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("modified"):
+            headers["If-Modified-Since"] = state["modified"]
     try:
-        for source, feed_url in feeds:
-            parsed = feedparser.parse(feed_url)
-            for entry in parsed.entries[:limit]:
-                image_url = None
-                media_thumb = entry.get("media_thumbnail")
-                media_content = entry.get("media_content")
-                if media_thumb and isinstance(media_thumb, list):
-                    image_url = media_thumb[0].get("url")
-                if not image_url and media_content and isinstance(media_content, list):
-                    image_url = media_content[0].get("url")
-
-                published_struct = entry.get("published_parsed") or entry.get("updated_parsed")
-                if published_struct:
-                    published_ts = int(time.mktime(published_struct))
-                    published_str = datetime.fromtimestamp(published_ts, tz=timezone.utc).strftime(
-                        "%Y-%m-%d %H:%M UTC"
-                    )
-                else:
-                    published_ts = None
-                    published_str = "Unknown time"
-                summary_raw = entry.get("summary") or entry.get("description")
-                if not summary_raw:
-                    content = entry.get("content")
-                    if isinstance(content, list) and content:
-                        summary_raw = content[0].get("value")
-                summary = clean_text(summary_raw)
-                results.append(
-                    {
-                        "title": entry.get("title", "Untitled"),
-                        "source": source,
-                        "summary": summary or "Summary unavailable.",
-                        "image": image_url,
-                        "url": entry.get("link"),
-                        "published_ts": published_ts,
-                        "published_str": published_str,
-                    }
-                )
-        if results:
-            cutoff = int(time.time()) - (7 * 24 * 60 * 60)
-            results = [r for r in results if r.get("published_ts") and r["published_ts"] >= cutoff]
-            results.sort(key=lambda r: r["published_ts"], reverse=True)
-            results = results[:limit]
-            try:
-                with open(NEWS_CACHE, "w", encoding="utf-8") as f:
-                    json.dump(results, f, indent=2, ensure_ascii=False)
-            except OSError:
-                pass
-            return _store(results)
+        resp = _http_get(feed_url, headers=headers, timeout=timeout)
+        if resp.status_code == 304 and state.get("items") is not None:
+            items, fresh = state["items"], 0
+        else:
+            resp.raise_for_status()
+            parsed = feedparser.parse(resp.content)
+            items = _news_items(source, parsed.entries, limit)
+            fresh = sum(1 for item in items if _news_key(item) not in _NEWS_STORE["items"])
+            state.update(etag=resp.headers.get("ETag"), modified=resp.headers.get("Last-Modified"), items=items)
     except Exception:
-        pass
+        state["failures"] = state.get("failures", 0) + 1
+        state["interval"] = _feed_interval(state, None, 0)
+        state["next_poll"] = time.time() + state["interval"]
+        raise
+    state["failures"] = 0
+    state["interval"] = _feed_interval(state, items, fresh)
+    state["next_poll"] = time.time() + state["interval"]
+    return items
+
 
-    if os.path.exists(NEWS_CACHE):
+def _load_news():
+    now = time.time()
+    deadline = now + NEWS_FETCH_BUDGET_SECONDS
+    timeout = min(10, NEWS_FETCH_BUDGET_SECONDS)
+    futures = {}
+    for source, feed_url in NEWS_FEEDS:
+        state = _FEED_STATE.setdefault(feed_url, {})
+        if state.get("next_poll", 0) > now:
+            continue
+        # Claimed until the fetch reports back, so an overlapping refresh skips it.
+        state["next_poll"] = now + timeout
+        futures[_FETCH_EXECUTOR.submit(_fetch_feed, source, feed_url, NEWS_FEED_LIMIT, timeout)] = feed_url
+    # Feeds still running at the deadline are left to finish in the background
+    # and contribute their previous items (if any) to this refresh.
+    wait(futures, timeout=max(0, deadline - time.time()))
+    results = []
+    for future, feed_url in futures.items():
         try:
-            with open(NEWS_CACHE, "r", encoding="utf-8") as f:
-                cached = json.load(f)
-            if isinstance(cached, list) and cached:
-                cutoff = int(time.time()) - (7 * 24 * 60 * 60)
-                cached = [r for r in cached if r.get("published_ts") and r["published_ts"] >= cutoff]
-                cached.sort(key=lambda r: r["published_ts"], reverse=True)
-                for item in cached:
-                    if not item.get("summary"):
-                        item["summary"] = "Summary unavailable."
-                return _store(cached[:limit])
-        except (OSError, json.JSONDecodeError):
+            if future.done():
+                results.extend(future.result())
+                continue
+        except Exception:
             pass
+        results.extend((_FEED_STATE.get(feed_url) or {}).get("items") or [])
+    polled = set(futures.values())
+    for _, feed_url in NEWS_FEEDS:
+        if feed_url not in polled:
+            results.extend(_FEED_STATE[feed_url].get("items") or [])
+    if not results:
+        return None
+    if not _NEWS_STORE["seeded"]:
+        # Start from the last persisted store so a restart keeps the past week.
+        _NEWS_STORE["seeded"] = True
+        results = read_cache_snapshot(NEWS_CACHE) + results
+    items = _merge_news(results)
+    _persist_snapshot(NEWS_CACHE, items)
+    return items
+
 
-    return _store([
+def _merge_news(results):
+    # New items are inserted in order, expired ones drop off the end; nothing is re-sorted.
+    cutoff = int(time.time()) - NEWS_MAX_AGE_SECONDS
+    with _NEWS_STORE_LOCK:
+        store = _NEWS_STORE["items"]
+        order = _NEWS_STORE["order"]
+        for item in results:
+            key = _news_key(item)
+            if not key or key in store or not item.get("published_ts") or item["published_ts"] < cutoff:
+                continue
+            store[key] = item
+            insort(order, (-item["published_ts"], key))
+        while order and (len(order) > NEWS_STORE_LIMIT or -order[-1][0] < cutoff):
+            store.pop(order.pop()[1], None)
+        return [store[key] for _, key in order]
+
+
+def get_crypto_news(limit=10):
+    items = _cached("news", _load_news)
+    if items:
+        return items[:limit]
+
+    cached = read_cache_snapshot(NEWS_CACHE)
+    cutoff = int(time.time()) - NEWS_MAX_AGE_SECONDS
+    cached = [r for r in cached if r.get("published_ts") and r["published_ts"] >= cutoff]
+    if cached:
+        cached.sort(key=lambda r: r["published_ts"], reverse=True)
+        for item in cached:
+            if not item.get("summary"):
+                item["summary"] = "Summary unavailable."
+        return cached[:limit]
+
+    return [
         {
             "title": "Crypto news feed will appear here once data loads.",
             "source": "CoinDesk",
@@ -695,4 +1209,13 @@ def get_crypto_news(limit=10):
             "published_ts": None,
             "published_str": "Unknown time",
         }
-    ])
+    ]
+
+
+_REFRESH_JOBS = [
+    ("btc", _load_btc_data),
+    *((key, lambda page=page: _load_top_page(page)) for page, key in enumerate(_top_page_keys(MARKETS_TOP_SIZE), start=1)),
+    ("my_coins", _load_my_coins),
+    ("fear_greed", _load_fear_greed),
+    ("news", _load_news),
+]
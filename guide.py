@@ -1,14 +1,81 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
 from flask import Blueprint, render_template, abort
+from http_cache import conditional_response, gzip_body
 
 guide_bp = Blueprint("guide", __name__)
 
+# Only code, templates and static assets can change a guide page; runtime data
+# files (caches, holdings) are deliberately not part of the stamp.
+DEPLOY_PATHS = ("guide.py", "templates", "static")
+DEPLOY_CHECK_SECONDS = 5
+
+RenderedPage = namedtuple("RenderedPage", "stamp etag body gzipped last_modified")
+_RENDERED = {}
+_RENDER_LOCK = threading.Lock()
+_DEPLOY = {"stamp": None, "checked": 0.0}
+
+
+def _deploy_stamp():
+    now = time.time()
+    if _DEPLOY["stamp"] is not None and now - _DEPLOY["checked"] < DEPLOY_CHECK_SECONDS:
+        return _DEPLOY["stamp"]
+    root = os.path.dirname(os.path.abspath(__file__))
+    latest = 0.0
+    for name in DEPLOY_PATHS:
+        path = os.path.join(root, name)
+        for base, dirs, files in os.walk(path) if os.path.isdir(path) else [(root, [], [name])]:
+            dirs[:] = [d for d in dirs if not d.startswith(".") and d != "__pycache__"]
+            for filename in files:
+                try:
+                    latest = max(latest, os.path.getmtime(os.path.join(base, filename)))
+                except OSError:
+                    continue
+    _DEPLOY["stamp"] = latest
+    _DEPLOY["checked"] = now
+    return latest
+
+
+def _rendered(slug, render_fn):
+    # Guide pages only change on deploy, so each one is rendered and compressed
+    # once per deploy stamp and then served from memory.
+    stamp = _deploy_stamp()
+    page = _RENDERED.get(slug)
+    if page is None or page.stamp != stamp:
+        with _RENDER_LOCK:
+            page = _RENDERED.get(slug)
+            if page is None or page.stamp != stamp:
+                body = render_fn().encode("utf-8")
+                page = RenderedPage(
+                    stamp,
+                    # Derived from the stamp (not the body) so every worker hands out the same tag.
+                    f"guide-{int(stamp * 1000):x}",
+                    body,
+                    gzip_body(body),
+                    datetime.fromtimestamp(int(stamp), tz=timezone.utc) if stamp else None,
+                )
+                _RENDERED[slug] = page
+    return conditional_response(
+        page.etag,
+        lambda: page.body,
+        mimetype="text/html",
+        gzipped=page.gzipped,
+        last_modified=page.last_modified,
+    )
+
 
 @guide_bp.route("/guide")
 def guide():
-    return render_template(
-        "guide.html",
-        active="guide",
-        page_title="Crypto Guide",
+    return _rendered(
+        "",
+        lambda: render_template(
+            "guide.html",
+            active="guide",
+            page_title="Crypto Guide",
+        ),
     )
 
 
@@ -182,9 +249,12 @@ def guide_detail(slug):
     page = GUIDE_PAGES.get(slug)
     if not page:
         abort(404)
-    return render_template(
-        "guide_detail.html",
-        page=page,
-        active="guide",
-        page_title=page["title"],
+    return _rendered(
+        slug,
+        lambda: render_template(
+            "guide_detail.html",
+            page=page,
+            active="guide",
+            page_title=page["title"],
+        ),
     )
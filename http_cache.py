@@ -0,0 +1,45 @@
+import gzip
+
+from flask import current_app, request
+
+GZIP_MIN_BYTES = 512
+
+
+def gzip_body(body):
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def wants_gzip():
+    return "gzip" in request.accept_encodings
+
+
+def conditional_response(etag, body_fn, mimetype="application/json", gzipped=None, last_modified=None):
+    # body_fn is only called when the client's copy is out of date.
+    matched = next((tag for tag in (etag, f"{etag}-gz") if request.if_none_match.contains(tag)), None)
+    if matched is None and last_modified is not None and not request.if_none_match:
+        since = request.if_modified_since
+        if since is not None and int(last_modified.timestamp()) <= int(since.timestamp()):
+            matched = f"{etag}-gz" if wants_gzip() else etag
+    if matched is not None:
+        response = current_app.response_class(status=304)
+        response.set_etag(matched)
+    else:
+        body = body_fn()
+        if wants_gzip() and len(body) >= GZIP_MIN_BYTES:
+            response = current_app.response_class(gzipped if gzipped is not None else gzip_body(body), mimetype=mimetype)
+            response.headers["Content-Encoding"] = "gzip"
+            response.set_etag(f"{etag}-gz")
+        else:
+            response = current_app.response_class(body, mimetype=mimetype)
+            response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def json_response(etag, payload_fn):
+    if etag is None:
+        return payload_fn()
+    return conditional_response(etag, lambda: current_app.json.dumps(payload_fn()).encode("utf-8"))
@@ -0,0 +1,115 @@
+import math
+import threading
+from array import array
+
+NUMERIC_FIELDS = ("price_usd", "change_24h", "change_7d", "volume_24h", "market_cap", "rank")
+# record field: CoinGecko /coins/markets field
+MARKET_FIELDS = {
+    "price_usd": "current_price",
+    "change_24h": "price_change_percentage_24h",
+    "change_7d": "price_change_percentage_7d_in_currency",
+    "volume_24h": "total_volume",
+    "market_cap": "market_cap",
+    "rank": "market_cap_rank",
+}
+
+
+def market_record(item, default=None):
+    # Normalises a CoinGecko markets item (or an already normalised record) into the coin dict used everywhere.
+    record = {
+        "id": item.get("id"),
+        "name": item.get("name"),
+        "symbol": (item.get("symbol") or "").upper(),
+        "image": item.get("image"),
+    }
+    for field, source in MARKET_FIELDS.items():
+        value = item.get(source)
+        if value is None:
+            value = item.get(field)
+        if field == "rank":
+            record[field] = value
+        elif value is None:
+            record[field] = default
+        else:
+            record[field] = float(value)
+    return record
+
+
+def _same(old, new):
+    return old == new or (math.isnan(old) and math.isnan(new))
+
+
+class MarketTable:
+    # Column store for the listed (top and watchlist) coins: one array of doubles per
+    # numeric field (NaN when unknown), indexed by a row number per coin id.
+    # version only moves when an existing row's data changes; new rows can't
+    # affect anything already built from the table. Rows are never freed or
+    # reused, so row numbers held by an older index always name the same coin.
+
+    def __init__(self):
+        self.ids = []
+        self.names = []
+        self.symbols = []
+        self.images = []
+        self.columns = {field: array("d") for field in NUMERIC_FIELDS}
+        self.row_of = {}
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, records):
+        if not records:
+            return []
+        with self._lock:
+            rows = []
+            changed = False
+            for record in records:
+                cid = record.get("id")
+                if not cid:
+                    continue
+                row = self.row_of.get(cid)
+                if row is None:
+                    row = len(self.ids)
+                    self.ids.append(cid)
+                    self.names.append(record.get("name"))
+                    self.symbols.append(record.get("symbol"))
+                    self.images.append(record.get("image"))
+                    for field, column in self.columns.items():
+                        value = record.get(field)
+                        column.append(math.nan if value is None else value)
+                    self.row_of[cid] = row
+                else:
+                    text = (
+                        record.get("name") or self.names[row],
+                        record.get("symbol") or self.symbols[row],
+                        record.get("image") or self.images[row],
+                    )
+                    if text != (self.names[row], self.symbols[row], self.images[row]):
+                        self.names[row], self.symbols[row], self.images[row] = text
+                        changed = True
+                    for field, column in self.columns.items():
+                        value = record.get(field)
+                        value = math.nan if value is None else value
+                        if not _same(column[row], value):
+                            column[row] = value
+                            changed = True
+                rows.append(row)
+            if changed:
+                self.version += 1
+            return rows
+
+    def value(self, field, row):
+        value = self.columns[field][row]
+        return None if math.isnan(value) else value
+
+    def record(self, row):
+        # Under the lock so a concurrent upsert can't hand out half-updated fields.
+        with self._lock:
+            record = {"id": self.ids[row], "name": self.names[row], "symbol": self.symbols[row], "image": self.images[row]}
+            for field in NUMERIC_FIELDS:
+                record[field] = self.value(field, row)
+        if record["rank"] is not None:
+            record["rank"] = int(record["rank"])
+        return record
+
+    def __len__(self):
+        return len(self.ids)
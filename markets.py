@@ -1,5 +1,5 @@
 from flask import Blueprint, render_template
-from crypto_data import get_btc_data, get_top_coins, get_my_coins
+from crypto_data import get_btc_data, get_markets_page, MARKETS_PAGE_SIZE
 
 markets_bp = Blueprint("markets", __name__)
 
@@ -25,23 +25,21 @@ WEBSITE_MAP = {
 }
 
 
+def with_websites(coins):
+    for coin in coins:
+        coin["website"] = WEBSITE_MAP.get(coin.get("id"))
+    return coins
+
+
 @markets_bp.route("/markets")
 def markets():
     btc = get_btc_data()
-    top = get_top_coins()
-    mine = get_my_coins()
-    merged = []
-    seen = set()
-    for coin in mine + top:
-        cid = coin.get("id")
-        if not cid or cid in seen:
-            continue
-        seen.add(cid)
-        coin["website"] = WEBSITE_MAP.get(cid)
-        merged.append(coin)
+    page = get_markets_page(limit=MARKETS_PAGE_SIZE)
     return render_template(
         "markets.html",
         btc=btc,
-        coins=merged,
+        coins=with_websites(page["items"]),
+        next_cursor=page["next_cursor"],
+        page_size=MARKETS_PAGE_SIZE,
         active="markets",
     )
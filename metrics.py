@@ -0,0 +1,109 @@
+import threading
+from bisect import bisect_left
+
+# Upper bounds in seconds; +Inf is implied.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def lines(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for label_values, value in values:
+            yield f"{self.name}{_labels(self.labels, label_values)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values: [per-bucket counts (last is +Inf), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def lines(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for label_values, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.labels, label_values, ('le', _number(float(bound))))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, label_values)} {_number(round(total, 6))}"
+            yield f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}"
+
+
+def gauge_lines(name, help_text, samples, labels=(), metric_type="gauge"):
+    # For values read at scrape time; samples is a list of (label values, value).
+    yield f"# HELP {name} {help_text}"
+    yield f"# TYPE {name} {metric_type}"
+    for label_values, value in samples:
+        yield f"{name}{_labels(labels, label_values)} {_number(value)}"
+
+
+def render(extra=()):
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.lines())
+    for block in extra:
+        lines.extend(block)
+    return "\n".join(lines) + "\n"
+
+
+UPSTREAM_REQUESTS = Counter("upstream_requests_total", "Upstream HTTP requests by host and status code.", ("host", "status"))
+UPSTREAM_ERRORS = Counter("upstream_errors_total", "Upstream requests that raised, returned 429 or 5xx.", ("host",))
+UPSTREAM_REJECTED = Counter("upstream_rejected_total", "Upstream requests refused locally.", ("host", "reason"))
+UPSTREAM_LATENCY = Histogram("upstream_request_seconds", "Upstream request latency.", ("host",))
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache reads by outcome (fresh, stale, stale_if_error, miss).", ("namespace", "result"))
+ROUTE_LATENCY = Histogram("http_request_seconds", "Request handling latency by route.", ("route", "method", "status"))
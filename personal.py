@@ -1,7 +1,5 @@
-import json
-import os
 from flask import Blueprint, render_template
-from crypto_data import get_btc_data, get_my_coins, load_holdings, MY_COINS_CACHE
+from crypto_data import get_btc_data, get_my_coins, load_holdings, read_cache_snapshot, MY_COINS_CACHE
 
 personal_bp = Blueprint("personal", __name__)
 
@@ -10,14 +8,8 @@ personal_bp = Blueprint("personal", __name__)
 def personal():
     btc = get_btc_data()
     my_coins = get_my_coins()
-    if not my_coins and os.path.exists(MY_COINS_CACHE):
-        try:
-            with open(MY_COINS_CACHE, "r", encoding="utf-8") as f:
-                cached = json.load(f)
-            if isinstance(cached, list) and cached:
-                my_coins = cached
-        except (OSError, json.JSONDecodeError):
-            pass
+    if not my_coins:
+        my_coins = read_cache_snapshot(MY_COINS_CACHE)
     if my_coins:
         order = [
             "smlo",
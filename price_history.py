@@ -0,0 +1,130 @@
+import queue
+import sqlite3
+import threading
+import time
+
+PRICE_HISTORY_DB = "price_history.db"
+PRUNE_INTERVAL_SECONDS = 600
+
+# tier: (bucket seconds, retention seconds)
+TIERS = {
+    "raw": (0, 2 * 24 * 3600),
+    "5m": (300, 30 * 24 * 3600),
+    "1h": (3600, 400 * 24 * 3600),
+}
+# range: (window seconds, tier)
+RANGES = {
+    "1h": (3600, "raw"),
+    "24h": (24 * 3600, "5m"),
+    "7d": (7 * 24 * 3600, "1h"),
+    "30d": (30 * 24 * 3600, "1h"),
+    "1y": (365 * 24 * 3600, "1h"),
+}
+
+_QUEUE = queue.Queue(maxsize=1000)
+_WRITER = {"thread": None, "pruned": 0.0}
+_WRITER_LOCK = threading.Lock()
+_LOCAL = threading.local()
+
+
+def _connect():
+    conn = getattr(_LOCAL, "conn", None)
+    if conn is not None and getattr(_LOCAL, "path", None) == PRICE_HISTORY_DB:
+        return conn
+    conn = sqlite3.connect(PRICE_HISTORY_DB, timeout=5, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    for tier in TIERS:
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS samples_{tier} (
+                coin_id TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                price REAL,
+                volume REAL,
+                market_cap REAL,
+                PRIMARY KEY (coin_id, ts)
+            ) WITHOUT ROWID
+            """
+        )
+        # Reads go by (coin_id, ts); pruning goes by ts alone and would scan the table without this.
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_samples_{tier}_ts ON samples_{tier} (ts)")
+    _LOCAL.conn = conn
+    _LOCAL.path = PRICE_HISTORY_DB
+    return conn
+
+
+def _write(rows, ts):
+    conn = _connect()
+    conn.execute("BEGIN")
+    try:
+        for tier, (bucket, _) in TIERS.items():
+            # Downsampled tiers keep the latest sample seen in each bucket.
+            bucket_ts = ts - ts % bucket if bucket else ts
+            conn.executemany(
+                f"INSERT OR REPLACE INTO samples_{tier} (coin_id, ts, price, volume, market_cap) VALUES (?, ?, ?, ?, ?)",
+                [(coin_id, bucket_ts, price, volume, cap) for coin_id, price, volume, cap in rows],
+            )
+        conn.execute("COMMIT")
+    except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _prune(now):
+    conn = _connect()
+    for tier, (_, retention) in TIERS.items():
+        conn.execute(f"DELETE FROM samples_{tier} WHERE ts < ?", (int(now - retention),))
+
+
+def _writer_loop():
+    while True:
+        rows, ts = _QUEUE.get()
+        try:
+            _write(rows, ts)
+            if ts - _WRITER["pruned"] >= PRUNE_INTERVAL_SECONDS:
+                _WRITER["pruned"] = ts
+                _prune(ts)
+        except sqlite3.Error:
+            pass
+
+
+def _ensure_writer():
+    thread = _WRITER["thread"]
+    if thread is not None and thread.is_alive():
+        return
+    with _WRITER_LOCK:
+        thread = _WRITER["thread"]
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=_writer_loop, name="price-history", daemon=True)
+            thread.start()
+            _WRITER["thread"] = thread
+
+
+def record_samples(coins, ts=None):
+    # Queued for the writer thread so fetchers never wait on SQLite.
+    rows = [
+        (coin.get("id"), coin.get("price_usd"), coin.get("volume_24h"), coin.get("market_cap"))
+        for coin in coins or []
+        if coin and coin.get("id") and coin.get("price_usd") is not None
+    ]
+    if not rows:
+        return
+    _ensure_writer()
+    try:
+        _QUEUE.put_nowait((rows, int(ts or time.time())))
+    except queue.Full:
+        pass
+
+
+def get_history(coin_id, range_name="24h"):
+    window, tier = RANGES[range_name]
+    since = int(time.time() - window)
+    try:
+        cur = _connect().execute(
+            f"SELECT ts, price, volume, market_cap FROM samples_{tier} WHERE coin_id = ? AND ts >= ? ORDER BY ts",
+            (coin_id, since),
+        )
+        return [list(row) for row in cur]
+    except sqlite3.Error:
+        return []
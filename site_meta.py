@@ -1,31 +1,94 @@
+import ctypes
+import ctypes.util
 import os
+import threading
+import time
 from datetime import datetime
 
 SITE_CREATED = "2026-02-07 00:00"
 
+WATCH_EXTENSIONS = (".py", ".html", ".css", ".js", ".json")
+POLL_SECONDS = 30
+# IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_MASK = 0x002 | 0x004 | 0x008 | 0x040 | 0x080 | 0x100 | 0x200
 
-def site_last_updated():
-    root = os.path.dirname(__file__)
-    watch_dirs = [
-        root,
-        os.path.join(root, "templates"),
-        os.path.join(root, "static"),
-    ]
+_STATE = {"value": None, "watcher": None}
+_LOCK = threading.Lock()
+
+
+def _watch_dirs(root):
+    for base, dirs, _ in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith(".") and d != "__pycache__"]
+        yield base
+
+
+def _scan(root):
     latest = 0.0
-    for folder in watch_dirs:
-        if not os.path.isdir(folder):
+    for base in _watch_dirs(root):
+        try:
+            names = os.listdir(base)
+        except OSError:
             continue
-        for base, _, files in os.walk(folder):
-            for name in files:
-                if not name.endswith((".py", ".html", ".css", ".js", ".json")):
-                    continue
-                path = os.path.join(base, name)
-                try:
-                    mtime = os.path.getmtime(path)
-                    if mtime > latest:
-                        latest = mtime
-                except OSError:
-                    continue
+        for name in names:
+            if not name.endswith(WATCH_EXTENSIONS):
+                continue
+            try:
+                mtime = os.path.getmtime(os.path.join(base, name))
+            except OSError:
+                continue
+            if mtime > latest:
+                latest = mtime
     if latest:
         return datetime.fromtimestamp(latest).strftime("%Y-%m-%d %H:%M")
     return SITE_CREATED
+
+
+def _inotify_fd(root, libc, fd=None):
+    if fd is None:
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+    # inotify is not recursive; (re)adding a watch for a known directory is a no-op.
+    for base in _watch_dirs(root):
+        libc.inotify_add_watch(fd, os.fsencode(base), INOTIFY_MASK)
+    return fd
+
+
+def _watch(root):
+    fd = None
+    try:
+        path = ctypes.util.find_library("c")
+        libc = ctypes.CDLL(path, use_errno=True) if path else None
+        if libc is not None and hasattr(libc, "inotify_init1"):
+            fd = _inotify_fd(root, libc)
+    except (OSError, AttributeError):
+        fd = None
+
+    while True:
+        if fd is not None:
+            try:
+                os.read(fd, 64 * 1024)
+            except OSError:
+                os.close(fd)
+                fd = None
+                continue
+            # Editors and deploys touch several files at once; settle before rescanning.
+            time.sleep(0.5)
+            _inotify_fd(root, libc, fd)
+        else:
+            time.sleep(POLL_SECONDS)
+        _STATE["value"] = _scan(root)
+
+
+def site_last_updated():
+    value = _STATE["value"]
+    if value is not None:
+        return value
+    with _LOCK:
+        if _STATE["value"] is None:
+            root = os.path.dirname(os.path.abspath(__file__))
+            _STATE["value"] = _scan(root)
+            watcher = threading.Thread(target=_watch, args=(root,), name="site-meta-watch", daemon=True)
+            watcher.start()
+            _STATE["watcher"] = watcher
+        return _STATE["value"]
@@ -0,0 +1,61 @@
+import threading
+
+from crypto_data import get_cache_version, get_crypto_news, NEWS_STORE_LIMIT
+from guide import GUIDE_PAGES
+from text_index import TextIndex
+
+_INDEX = TextIndex()
+_NEWS = {"version": None, "ids": set()}
+_NEWS_LOCK = threading.Lock()
+
+
+def _index_guide():
+    for slug, page in GUIDE_PAGES.items():
+        for number, section in enumerate(page["sections"], start=1):
+            _INDEX.add(
+                f"guide:{slug}:{number}",
+                section["heading"],
+                section["body"],
+                type="guide",
+                page=page["title"],
+                url=f"/guide/{slug}#section-{number}",
+            )
+
+
+def _sync_news():
+    # Only items that appeared or dropped out since the last news version touch the index.
+    items = get_crypto_news(limit=NEWS_STORE_LIMIT)
+    version = get_cache_version("news")
+    if version is None or version == _NEWS["version"]:
+        return
+    with _NEWS_LOCK:
+        if version == _NEWS["version"]:
+            return
+        current = {}
+        for item in items:
+            key = item.get("url") or item.get("title")
+            if key:
+                current[f"news:{key}"] = item
+        for doc_id in _NEWS["ids"] - current.keys():
+            _INDEX.remove(doc_id)
+        for doc_id, item in current.items():
+            if doc_id not in _NEWS["ids"]:
+                _INDEX.add(
+                    doc_id,
+                    item.get("title") or "",
+                    item.get("summary") or "",
+                    type="news",
+                    source=item.get("source"),
+                    published=item.get("published_str"),
+                    url=item.get("url"),
+                )
+        _NEWS["ids"] = set(current)
+        _NEWS["version"] = version
+
+
+def find(query, limit=10):
+    _sync_news()
+    return _INDEX.search(query, limit=limit)
+
+
+_index_guide()
@@ -0,0 +1,121 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+SUGGESTIONS_DB = "suggestions.db"
+LEGACY_SUGGESTIONS_PATH = "suggestions.json"
+STATUSES = ("new", "in_progress", "done")
+
+_LOCAL = threading.local()
+_INIT_LOCK = threading.Lock()
+_INITIALIZED = set()
+
+
+def _connect():
+    conn = getattr(_LOCAL, "conn", None)
+    if conn is not None and getattr(_LOCAL, "path", None) == SUGGESTIONS_DB:
+        return conn
+    conn = sqlite3.connect(SUGGESTIONS_DB, timeout=5, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    _LOCAL.conn = conn
+    _LOCAL.path = SUGGESTIONS_DB
+    with _INIT_LOCK:
+        if SUGGESTIONS_DB not in _INITIALIZED:
+            _init_schema(conn)
+            _INITIALIZED.add(SUGGESTIONS_DB)
+    return conn
+
+
+def _init_schema(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS suggestions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT NOT NULL,
+            message TEXT NOT NULL,
+            created TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'new'
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_suggestions_status ON suggestions (status, id)")
+    _migrate_legacy(conn)
+
+
+def _migrate_legacy(conn):
+    # One-time import of the old list-in-a-JSON-file store, oldest first so ids keep the order.
+    if not os.path.exists(LEGACY_SUGGESTIONS_PATH):
+        return
+    try:
+        with open(LEGACY_SUGGESTIONS_PATH, "r", encoding="utf-8") as f:
+            items = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return
+    if not isinstance(items, list):
+        return
+    rows = [
+        (item.get("email", ""), item.get("message", ""), item.get("created", ""), item.get("status") or "new")
+        for item in items
+        if isinstance(item, dict)
+    ]
+    # The emptiness check runs under the write lock: _INIT_LOCK only covers this
+    # process, and another worker may be importing the same file right now.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM suggestions LIMIT 1").fetchone():
+            conn.execute("ROLLBACK")
+            return
+        conn.executemany("INSERT INTO suggestions (email, message, created, status) VALUES (?, ?, ?, ?)", rows)
+        conn.execute("COMMIT")
+    except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        return
+    try:
+        os.replace(LEGACY_SUGGESTIONS_PATH, LEGACY_SUGGESTIONS_PATH + ".migrated")
+    except OSError:
+        pass
+
+
+def load_suggestions(status=None, limit=None, offset=0):
+    sql = "SELECT id, email, message, created, status FROM suggestions"
+    params = []
+    if status is not None:
+        sql += " WHERE status = ?"
+        params.append(status)
+    sql += " ORDER BY id DESC"
+    if limit is not None:
+        sql += " LIMIT ? OFFSET ?"
+        params.extend([int(limit), int(offset)])
+    return [dict(row) for row in _connect().execute(sql, params)]
+
+
+def count_suggestions():
+    counts = {status: 0 for status in STATUSES}
+    for row in _connect().execute("SELECT status, COUNT(*) AS n FROM suggestions GROUP BY status"):
+        counts[row["status"]] = row["n"]
+    counts["total"] = sum(counts[status] for status in STATUSES)
+    return counts
+
+
+def add_suggestion(email, message):
+    cur = _connect().execute(
+        "INSERT INTO suggestions (email, message, created, status) VALUES (?, ?, ?, 'new')",
+        (email, message, datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")),
+    )
+    return cur.lastrowid
+
+
+def update_suggestion_status(suggestion_id, status):
+    if status not in STATUSES:
+        return False
+    cur = _connect().execute("UPDATE suggestions SET status = ? WHERE id = ?", (status, suggestion_id))
+    return cur.rowcount > 0
+
+
+def delete_suggestion(suggestion_id):
+    cur = _connect().execute("DELETE FROM suggestions WHERE id = ?", (suggestion_id,))
+    return cur.rowcount > 0
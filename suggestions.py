@@ -1,5 +1,5 @@
 from flask import Blueprint, render_template, request
-from crypto_data import add_suggestion
+from suggestion_store import add_suggestion
 
 suggestions_bp = Blueprint("suggestions", __name__)
 
@@ -0,0 +1,51 @@
+import pytest
+
+from text_index import TextIndex, stem
+
+
+@pytest.mark.parametrize(
+    "singular, plural",
+    [
+        ("price", "prices"),
+        ("exchange", "exchanges"),
+        ("phrase", "phrases"),
+        ("box", "boxes"),
+        ("class", "classes"),
+        ("security", "securities"),
+        ("gas", "gases"),
+        ("bus", "buses"),
+    ],
+)
+def test_plural_matches_singular(singular, plural):
+    assert stem(plural) == stem(singular)
+
+
+@pytest.mark.parametrize(
+    "base, inflected",
+    [
+        ("stake", "staked"),
+        ("stake", "staking"),
+        ("price", "pricing"),
+        ("trade", "trader"),
+        ("run", "running"),
+        ("build", "building"),
+        ("exchange", "exchanged"),
+        ("exchange", "exchanging"),
+        ("secure", "secured"),
+        ("issue", "issued"),
+    ],
+)
+def test_inflections_match_base(base, inflected):
+    assert stem(inflected) == stem(base)
+
+
+def test_news_does_not_collide_with_new():
+    assert stem("news") != stem("new")
+
+
+def test_search_matches_across_word_forms():
+    index = TextIndex()
+    index.add("tips", "Tips", "Compare prices on exchanges before trading.")
+    index.add("other", "Other", "Nothing relevant here.")
+    hits = index.search("exchange price", prefix=False)
+    assert [hit["title"] for hit in hits] == ["Tips"]
@@ -0,0 +1,205 @@
+import math
+import re
+import threading
+from bisect import bisect_left
+from functools import lru_cache
+
+# BM25 parameters.
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 3
+PREFIX_EXPANSION_LIMIT = 20
+SNIPPET_CHARS = 160
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how if in into is it its of on or so that the their then there "
+    "they this to was what when which who why will with you your".split()
+)
+SUFFIXES = ("ation", "ment", "ing", "ied", "er", "ed", "ly")
+# Suffixes after which a dropped final "e" is put back (traded -> trade, pricing -> price).
+E_SUFFIXES = ("ing", "er", "ed")
+# Forms the suffix rules get wrong, as in Snowball's English stemmer.
+STEM_EXCEPTIONS = {
+    "news": "news",
+    "gases": "gas",
+    "buses": "bus",
+    "bias": "bias",
+    "biases": "bias",
+    "alias": "alias",
+    "aliases": "alias",
+    "atlas": "atlas",
+    "series": "series",
+    "species": "species",
+}
+_WORD = re.compile(r"[a-z0-9]+")
+_VOWELS = "aeiou"
+
+
+def _measure(word):
+    # Porter's m: the number of vowel-consonant sequences in the word.
+    pattern = "".join("v" if ch in _VOWELS or (ch == "y" and i and word[i - 1] not in _VOWELS) else "c" for i, ch in enumerate(word))
+    return pattern.count("vc"), pattern
+
+
+def _restore_e(base):
+    if len(base) >= 2 and base[-1] == base[-2] and base[-1] not in _VOWELS + "lsz":
+        return base[:-1]
+    if base.endswith(("at", "bl", "iz")):
+        return base + "e"
+    if _short_syllable(base):
+        return base + "e"
+    return base
+
+
+def _short_syllable(base):
+    m, pattern = _measure(base)
+    return m == 1 and pattern.endswith("cvc" if len(base) > 2 else "vc") and base[-1] not in "wxy"
+
+
+def _drop_e(word):
+    # Porter step 5a, applied to every form so exchange/exchanged/exchanging all
+    # end up as "exchang" while price/priced keep their "e".
+    if not word.endswith("e"):
+        return word
+    base = word[:-1]
+    m = _measure(base)[0]
+    if m > 1 or (m == 1 and not _short_syllable(base)):
+        return base
+    return word
+
+
+@lru_cache(maxsize=50000)
+def stem(word):
+    # Porter-style steps 1 and 5a plus a few common derivational endings, so
+    # price/prices/priced/pricing and stake/staked/staking meet on one term.
+    if word in STEM_EXCEPTIONS:
+        return STEM_EXCEPTIONS[word]
+    if len(word) <= 3:
+        return word
+    return _drop_e(_strip_suffixes(word))
+
+
+def _strip_suffixes(word):
+    if word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith("es") and word[:-2].endswith(("ss", "x", "z", "ch", "sh")):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    for suffix in SUFFIXES:
+        if not word.endswith(suffix):
+            continue
+        base = word[: -len(suffix)]
+        if suffix == "ied" and len(base) >= 2:
+            return base + "y"
+        if len(base) >= 2 and any(ch in _VOWELS + "y" for ch in base):
+            return _restore_e(base) if suffix in E_SUFFIXES else base
+        break
+    return word
+
+
+def tokenize(text):
+    return [stem(word) for word in _WORD.findall((text or "").lower()) if word not in STOPWORDS]
+
+
+def _snippet(text, terms):
+    lowered = text.lower()
+    start = 0
+    for match in _WORD.finditer(lowered):
+        if stem(match.group()) in terms:
+            start = match.start()
+            break
+    start = max(0, text.rfind(" ", 0, max(0, start - SNIPPET_CHARS // 4)) + 1)
+    snippet = text[start:start + SNIPPET_CHARS]
+    if start + SNIPPET_CHARS < len(text):
+        snippet = snippet[: snippet.rfind(" ")] + "…"
+    return ("…" if start else "") + snippet.replace("\n", " ")
+
+
+class TextIndex:
+    # Inverted index with BM25 ranking. Documents can be added and removed one
+    # at a time, so feeds that change a few items per refresh stay cheap.
+
+    def __init__(self):
+        self.postings = {}
+        self.docs = {}
+        self.total_length = 0
+        self._terms = None
+        self._lock = threading.Lock()
+
+    def add(self, doc_id, title, text, **meta):
+        counts = {}
+        for term in tokenize(title):
+            counts[term] = counts.get(term, 0) + TITLE_WEIGHT
+        for term in tokenize(text):
+            counts[term] = counts.get(term, 0) + 1
+        length = sum(counts.values())
+        with self._lock:
+            self._remove(doc_id)
+            self.docs[doc_id] = {"title": title, "text": text, "length": length, "terms": tuple(counts), "meta": meta}
+            self.total_length += length
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+            self._terms = None
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self.total_length -= doc["length"]
+        for term in doc["terms"]:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+        self._terms = None
+
+    def _expand(self, prefix):
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+        terms = []
+        for term in self._terms[bisect_left(self._terms, prefix):]:
+            if not term.startswith(prefix) or len(terms) >= PREFIX_EXPANSION_LIMIT:
+                break
+            terms.append(term)
+        return terms
+
+    def search(self, query, limit=10, prefix=True):
+        words = [word for word in _WORD.findall((query or "").lower()) if word not in STOPWORDS]
+        if not words:
+            return []
+        with self._lock:
+            if not self.docs:
+                return []
+            terms = {stem(word) for word in words}
+            if prefix and len(words[-1]) >= 2:
+                # The last word may still be being typed.
+                terms.update(self._expand(words[-1]))
+            count = len(self.docs)
+            avg_length = self.total_length / count
+            scores = {}
+            for term in terms:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    norm = K1 * (1 - B + B * self.docs[doc_id]["length"] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+            ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
+            hits = []
+            for doc_id in ranked:
+                doc = self.docs[doc_id]
+                hit = dict(doc["meta"], title=doc["title"], snippet=_snippet(doc["text"], terms), score=round(scores[doc_id], 3))
+                hits.append(hit)
+            return hits
+
+    def __len__(self):
+        return len(self.docs)
@@ -0,0 +1,164 @@
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+import metrics
+
+# host: (requests per second, burst size)
+HOST_RATE_LIMITS = {
+    "api.coingecko.com": (0.5, 10),
+    "api.geckoterminal.com": (0.5, 10),
+    "trade.nestex.one": (1.0, 5),
+    "api.alternative.me": (1.0, 5),
+}
+FAILURE_THRESHOLD = 5
+OPEN_SECONDS = 60
+MAX_QUEUE_SECONDS = 1.0
+
+
+class UpstreamUnavailable(requests.RequestException):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait=0.0):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            if wait > max_wait:
+                return False
+            # Reserve the token now so concurrent callers queue behind us.
+            self.tokens -= 1
+        if wait:
+            time.sleep(wait)
+        return True
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, open_seconds=OPEN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.failures = 0
+        self.open_until = 0.0
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.open_until == 0:
+            return "closed"
+        return "open" if time.time() < self.open_until else "half_open"
+
+    def allow(self):
+        with self._lock:
+            if self.open_until == 0:
+                return True
+            if time.time() < self.open_until or self.probing:
+                return False
+            # Half-open: let a single probe request through.
+            self.probing = True
+            return True
+
+    def cancel(self):
+        with self._lock:
+            self.probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.open_until = 0.0
+            self.probing = False
+
+    def record_failure(self, retry_after=None):
+        with self._lock:
+            self.failures += 1
+            if retry_after is not None:
+                self.open_until = time.time() + retry_after
+            elif self.probing or self.failures >= self.failure_threshold:
+                self.open_until = time.time() + self.open_seconds
+            self.probing = False
+
+
+_BUCKETS = {host: TokenBucket(rate, burst) for host, (rate, burst) in HOST_RATE_LIMITS.items()}
+_BREAKERS = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def _breaker(host):
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get(host)
+        if breaker is None:
+            breaker = _BREAKERS[host] = CircuitBreaker()
+        return breaker
+
+
+def _retry_after(resp):
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def get(session, url, max_wait=MAX_QUEUE_SECONDS, **kwargs):
+    host = urlparse(url).hostname or ""
+    breaker = _breaker(host)
+    if not breaker.allow():
+        metrics.UPSTREAM_REJECTED.inc(host, "circuit_open")
+        raise UpstreamUnavailable(f"{host} circuit open")
+    bucket = _BUCKETS.get(host)
+    if bucket and not bucket.acquire(max_wait):
+        breaker.cancel()
+        metrics.UPSTREAM_REJECTED.inc(host, "rate_limited")
+        raise UpstreamUnavailable(f"{host} rate limited locally")
+    started = time.perf_counter()
+    try:
+        resp = session.get(url, **kwargs)
+    except requests.RequestException:
+        metrics.UPSTREAM_LATENCY.observe(time.perf_counter() - started, host)
+        metrics.UPSTREAM_REQUESTS.inc(host, "error")
+        metrics.UPSTREAM_ERRORS.inc(host)
+        breaker.record_failure()
+        raise
+    metrics.UPSTREAM_LATENCY.observe(time.perf_counter() - started, host)
+    metrics.UPSTREAM_REQUESTS.inc(host, str(resp.status_code))
+    if resp.status_code == 429:
+        metrics.UPSTREAM_ERRORS.inc(host)
+        breaker.record_failure(_retry_after(resp))
+    elif resp.status_code >= 500:
+        metrics.UPSTREAM_ERRORS.inc(host)
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return resp
+
+
+def snapshot():
+    with _BREAKERS_LOCK:
+        breakers = dict(_BREAKERS)
+    return {
+        host: {"state": breaker.state, "failures": breaker.failures}
+        for host, breaker in breakers.items()
+    }